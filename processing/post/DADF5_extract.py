@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import os
+import argparse
+
+import damask
+
+scriptName = os.path.splitext(os.path.basename(__file__))[0]
+scriptID   = ' '.join([scriptName,damask.version])
+
+# --------------------------------------------------------------------
+#                                MAIN
+# --------------------------------------------------------------------
+parser = argparse.ArgumentParser(description='Write selected increments, phases, and datasets to a new DADF5 file.')
+
+parser.add_argument('filenames', nargs='+',
+                    help='DADF5 files')
+parser.add_argument('-d','--dir', dest='dir',default='extract',metavar='string',
+                    help='name of subdirectory relative to the location of the DADF5 file to hold output')
+selection = parser.add_mutually_exclusive_group()
+selection.add_argument('--inc', nargs='+', type=int,
+                       help='increments to extract',dest='inc')
+selection.add_argument('--range', nargs=2, type=float, metavar=('start','end'),
+                       help='time range to extract',dest='range')
+parser.add_argument('--phases', nargs='+',
+                    help='phases (constituents) to extract',dest='phases')
+parser.add_argument('--homogenizations', nargs='+',
+                    help='homogenizations (materialpoints) to extract',dest='homogenizations')
+parser.add_argument('--labels', nargs='+',
+                    help='labels of datasets to extract',dest='labels')
+parser.add_argument('--compression', choices=['gzip','lzf','none'],default='gzip',
+                    help='compression filter [%(default)s]',dest='compression')
+parser.add_argument('--level', type=int, default=4,
+                    help='compression level of gzip filter [%(default)s]',dest='level')
+parser.add_argument('--float32', action='store_true',
+                    help='store floating point data with single precision',dest='float32')
+
+options = parser.parse_args()
+
+for filename in options.filenames:
+    results = damask.Result(filename)
+
+    if options.inc is not None:
+        results.pick('increments',options.inc)
+    if options.range is not None:
+        results.pick('times',results.times_in_range(*options.range))
+    if options.phases is not None:
+        results.pick('constituents',options.phases)
+    if options.homogenizations is not None:
+        results.pick('materialpoints',options.homogenizations)
+
+    dirname  = os.path.abspath(os.path.join(os.path.dirname(filename),options.dir))
+    if not os.path.isdir(dirname):
+        os.mkdir(dirname,0o755)
+    results.save_DADF5(os.path.join(dirname,os.path.split(filename)[-1]),options.labels,
+                       compression=None if options.compression == 'none' else options.compression,
+                       level=options.level,float32=options.float32)
@@ -25,6 +25,8 @@ from ._config          import Config           # noqa
 from ._configmaterial  import ConfigMaterial   # noqa
 from ._geom            import Geom             # noqa
 from ._result          import Result           # noqa
+from ._resultcollection import ResultCollection # noqa
+from ._datasetview     import DatasetView      # noqa
 
 
 
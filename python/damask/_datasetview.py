@@ -0,0 +1,274 @@
+import copy
+
+import numpy as np
+
+
+class DatasetView:
+    """
+    Lazy view of a dataset over increments and cells, see Result.view.
+
+    The view has the shape (N_increments,N_cells,...). Indexing and NumPy
+    ufuncs return new views; data is read only on evaluation (compute,
+    numpy.asarray, reductions), one increment at a time and restricted to
+    the selected cells.
+
+    Indexing of the increment and cell axes is orthogonal, i.e. integer
+    arrays select increments and cells independently of each other.
+    Constants in ufuncs are broadcast against the data of one increment,
+    i.e. they must not extend over the increment axis.
+    """
+
+    def __init__(self,result,label,paths,c=0,plain=False):
+        """
+        New view of a dataset.
+
+        Parameters
+        ----------
+        result : damask.Result
+            Result object to read from.
+        label : str
+            Label of the dataset.
+        paths : dict
+            Locations of the dataset in each increment, see Result.get_dataset_location.
+        c : int, optional
+            Constituent to consider. Defaults to 0.
+        plain : bool, optional
+            Treat structured data (e.g. orientations) as plain float array. Defaults to False.
+
+        """
+        self.label = label
+        self.increments = list(paths)
+        self._result = result
+        self._paths = paths
+        self._c = c
+        self._plain = plain
+
+        first = paths[self.increments[0]][0]
+        info = result._get_index()[first.rsplit('/',1)[0]][label]
+        self._N_cells = info['shape'][0] if first.split('/')[1] == 'geometry' else result.Nmaterialpoints
+        self._cells = None
+        self._ufunc = None
+        self._inputs = None
+        self._squeeze = (False,False)
+        self._tensor_keys = []
+
+        shape = info['shape'][1:] if first.split('/')[1] == 'geometry' or len(info['shape']) > 1 else (1,)
+        dtype = info['dtype']
+        if plain and dtype.names is not None:
+            shape,dtype = shape+(len(dtype.names),),np.dtype('float64')
+        self._dummy_block = np.zeros((1,)+shape,dtype)
+
+
+    def __repr__(self):
+        """Give short summary."""
+        return f'DatasetView of "{self.label}" with shape {self.shape} and dtype {self.dtype}'
+
+
+    def __len__(self):
+        """Length of the first axis."""
+        return self.shape[0]
+
+
+    def _dummy(self):
+        """Return a block of one cell with the data type and tensor shape of the view."""
+        if self._ufunc is None:
+            dummy = self._dummy_block
+        else:
+            with np.errstate(all='ignore'):
+                dummy = self._ufunc(*[v._dummy() if isinstance(v,DatasetView) else v for v in self._inputs])
+        for k in self._tensor_keys: dummy = dummy[(slice(None),)+k]
+        return dummy
+
+
+    @property
+    def _internal_shape(self):
+        """Shape without squeezing, i.e. (N_increments,N_cells,...)."""
+        v = self
+        while v._ufunc is not None:
+            v = next(i for i in v._inputs if isinstance(i,DatasetView))
+        N_cells = v._N_cells if v._cells is None else len(v._cells)
+        return (len(v.increments),N_cells) + self._dummy().shape[1:]
+
+
+    @property
+    def shape(self):
+        """Shape of the view."""
+        return tuple(s for j,s in enumerate(self._internal_shape) if j >= 2 or not self._squeeze[j])
+
+
+    @property
+    def ndim(self):
+        """Number of dimensions of the view."""
+        return len(self.shape)
+
+
+    @property
+    def dtype(self):
+        """Data type of the view."""
+        return self._dummy().dtype
+
+
+    def _select(self,increments,cells):
+        """Return a view with increments and cells selected by (internal) indices."""
+        v = copy.copy(self)
+        if self._ufunc is not None:
+            v._inputs = [i._select(increments,cells) if isinstance(i,DatasetView) else i for i in self._inputs]
+        else:
+            v.increments = [self.increments[i] for i in increments]
+            v._cells = (np.arange(self._N_cells) if self._cells is None else self._cells)[cells]
+        return v
+
+
+    def __getitem__(self,key):
+        """Select increments, cells, and/or tensor components."""
+        key = key if isinstance(key,tuple) else (key,)
+        if any(k is None for k in key):
+            raise IndexError('new axes are not supported')
+        if sum(k is Ellipsis for k in key) > 1:
+            raise IndexError('an index can only have a single ellipsis')
+        if any(k is Ellipsis for k in key):
+            e = [j for j,k in enumerate(key) if k is Ellipsis][0]
+            key = key[:e] + (slice(None),)*(self.ndim-len(key)+1) + key[e+1:]
+        if len(key) > self.ndim:
+            raise IndexError(f'too many indices for view with {self.ndim} dimensions')
+        key = key + (slice(None),)*(self.ndim-len(key))
+
+        internal = self._internal_shape
+        selection = []
+        squeeze = list(self._squeeze)
+        for a in range(2):
+            if self._squeeze[a]:
+                selection.append(np.arange(internal[a]))
+                continue
+            k,key = key[0],key[1:]
+            if isinstance(k,(int,np.integer)):
+                if not -internal[a] <= k < internal[a]:
+                    raise IndexError(f'index {k} is out of bounds for axis with size {internal[a]}')
+                selection.append(np.array([k%internal[a]]))
+                squeeze[a] = True
+            else:
+                selection.append(np.arange(internal[a])[k])
+                if selection[-1].ndim != 1:
+                    raise IndexError('only one-dimensional indices are supported for increments and cells')
+
+        v = self._select(*selection)
+        v._squeeze = tuple(squeeze)
+        if not all(isinstance(k,slice) and k == slice(None) for k in key):
+            v._tensor_keys = self._tensor_keys + [key]
+        return v
+
+
+    def _block(self,i):
+        """Return the data of an increment, shape (N_cells,...)."""
+        if self._ufunc is None:
+            block = self._result.read_dataset(self._paths[self.increments[i]],self._c,self._plain,self._cells)
+            if block.ndim == 1: block = block.reshape(-1,1)
+        else:
+            block = self._ufunc(*[v._block(i) if isinstance(v,DatasetView) else v for v in self._inputs])
+        for k in self._tensor_keys: block = block[(slice(None),)+k]
+        return block
+
+
+    def _finalize(self,data):
+        """Remove squeezed axes from data of internal shape."""
+        return data.reshape([s for j,s in enumerate(data.shape) if j >= 2 or not self._squeeze[j]])
+
+
+    def compute(self):
+        """
+        Read the selected data.
+
+        Returns
+        -------
+        data : numpy.ndarray
+            Data of the view.
+
+        """
+        internal = self._internal_shape
+        data = np.empty(internal,self.dtype)
+        for i in range(internal[0]):
+            data[i] = self._block(i)
+        return self._finalize(data)
+
+
+    def __array__(self,dtype=None):
+        """Read the selected data, e.g. for numpy.asarray."""
+        return self.compute() if dtype is None else self.compute().astype(dtype)
+
+
+    def __array_ufunc__(self,ufunc,method,*inputs,**kwargs):
+        """Apply elementwise ufuncs lazily."""
+        if method != '__call__' or kwargs:
+            return NotImplemented
+        views = [v for v in inputs if isinstance(v,DatasetView)]
+        if any(v.shape != views[0].shape or v._squeeze != views[0]._squeeze for v in views):
+            raise ValueError('views must have the same shape')
+        if any(np.ndim(v) > len(views[0]._internal_shape)-2 for v in inputs if not isinstance(v,DatasetView)):
+            return NotImplemented                                                                   # constant extends over cells
+
+        v = copy.copy(views[0])
+        v._ufunc = ufunc
+        v._inputs = list(inputs)
+        v._tensor_keys = []
+        return v
+
+
+    def __add__(self,other):      return np.add(self,other)
+    def __radd__(self,other):     return np.add(other,self)
+    def __sub__(self,other):      return np.subtract(self,other)
+    def __rsub__(self,other):     return np.subtract(other,self)
+    def __mul__(self,other):      return np.multiply(self,other)
+    def __rmul__(self,other):     return np.multiply(other,self)
+    def __truediv__(self,other):  return np.true_divide(self,other)
+    def __rtruediv__(self,other): return np.true_divide(other,self)
+    def __pow__(self,other):      return np.power(self,other)
+    def __neg__(self):            return np.negative(self)
+    def __abs__(self):            return np.absolute(self)
+
+
+    def _reduce(self,reduction,axis,out):
+        """Reduce increment by increment, i.e. without reading all data at once."""
+        visible = [j for j in range(len(self._internal_shape)) if j >= 2 or not self._squeeze[j]]
+        axes = range(self.ndim) if axis is None else [int(a) for a in np.atleast_1d(axis)]
+        if any(not -self.ndim <= a < self.ndim for a in axes):
+            raise np.AxisError(f'axis {axis} is out of bounds for view with {self.ndim} dimensions')
+        axes = [visible[a%self.ndim] for a in axes]
+
+        func,combine = {'sum':  (np.sum,np.add),
+                        'mean': (np.sum,np.add),
+                        'min':  (np.min,np.minimum),
+                        'max':  (np.max,np.maximum)}[reduction]
+        block_axes = tuple(a-1 for a in axes if a > 0)
+        partial = []
+        for i in range(self._internal_shape[0]):
+            r = func(self._block(i),axis=block_axes,keepdims=True)
+            if 0 in axes and partial:
+                partial[0] = combine(partial[0],r)
+            else:
+                partial.append(r)
+        data = np.stack(partial)
+        if reduction == 'mean':
+            data = data/np.prod([self._internal_shape[a] for a in axes])
+
+        data = data.reshape([s for j,s in enumerate(data.shape) if j in visible and j not in axes])
+        if out is not None:
+            out[...] = data
+            return out
+        return data if data.ndim > 0 else data[()]
+
+
+    def sum(self,axis=None,dtype=None,out=None):
+        """Sum over the given axes."""
+        return self._reduce('sum',axis,out) if dtype is None else self._reduce('sum',axis,out).astype(dtype)
+
+    def mean(self,axis=None,dtype=None,out=None):
+        """Arithmetic mean over the given axes."""
+        return self._reduce('mean',axis,out) if dtype is None else self._reduce('mean',axis,out).astype(dtype)
+
+    def min(self,axis=None,out=None):
+        """Minimum over the given axes."""
+        return self._reduce('min',axis,out)
+
+    def max(self,axis=None,out=None):
+        """Maximum over the given axes."""
+        return self._reduce('max',axis,out)
@@ -1,27 +1,341 @@
 import multiprocessing as mp
+from multiprocessing import shared_memory
+from multiprocessing import resource_tracker
+from multiprocessing.pool import ThreadPool
+import collections
+import copy
+import hashlib
+import json
+import zlib
+import ast
 import re
+import types
 import glob
 import os
+import time
 import datetime
 import xml.etree.ElementTree as ET
 import xml.dom.minidom
 from pathlib import Path
-from functools import partial
+from functools import lru_cache
+from contextlib import contextmanager
 
 import h5py
 import numpy as np
 from numpy.lib import recfunctions as rfn
+from scipy import spatial
 
 import damask
 from . import VTK
 from . import Table
 from . import Orientation
+from ._datasetview import DatasetView
 from . import grid_filters
 from . import mechanics
 from . import util
 
 h5py3 = h5py.__version__[0] == '3'
 
+@lru_cache(maxsize=1024)
+def _match_all(names,patterns):
+    """Check whether the dataset names match the (wildcard) patterns, see Result.groups_with_datasets."""
+    return len(set([e for e_ in [glob.fnmatch.filter(names,p) for p in patterns] for e in e_])) == len(patterns)
+
+_formula_nodes = (ast.Expression,ast.BinOp,ast.UnaryOp,ast.Compare,ast.BoolOp,ast.IfExp,
+                  ast.Call,ast.keyword,ast.Name,ast.Attribute,ast.Constant,ast.Load,
+                  ast.Subscript,ast.Slice,ast.Tuple,ast.List,
+                  ast.operator,ast.unaryop,ast.cmpop,ast.boolop)
+_formula_functions = {'abs','absolute','sqrt','cbrt','square','exp','log','log10','log2','power','sign',
+                      'sin','cos','tan','arcsin','arccos','arctan','arctan2','sinh','cosh','tanh',
+                      'degrees','radians','deg2rad','rad2deg','maximum','minimum','floor','ceil','round',
+                      'clip','where','isnan','isfinite','real','imag','conj',
+                      'sum','prod','mean','average','std','var','min','max','amin','amax','median',
+                      'trace','transpose','swapaxes','moveaxis','reshape','squeeze','expand_dims',
+                      'einsum','matmul','dot','cross','outer','stack','concatenate','broadcast_to',
+                      'eye','ones_like','zeros_like','full_like','float32','float64','pi','e','newaxis',
+                      'linalg','det','inv','norm','eigh','eigvalsh','svd'}
+
+
+@lru_cache(maxsize=None)
+def _compile_formula(formula,functions=()):
+    """
+    Parse, validate, and compile a formula of Result.add_calculation.
+
+    Existing datasets are referenced by '#TheirLabel#'. Only arithmetic
+    expressions, indexing, selected NumPy functions (as 'np.function'),
+    and the given user functions are permitted.
+
+    Parameters
+    ----------
+    formula : str
+        Formula to compile.
+    functions : tuple of str, optional
+        Names of permitted user functions.
+
+    Returns
+    -------
+    code : code object
+        Compiled formula expecting the datasets as variables '_0', '_1', ...
+    labels : list of str
+        Labels of the datasets in order of the variables.
+    pointwise : bool
+        Whether the formula can be evaluated for blocks of points separately.
+
+    """
+    labels = list(dict.fromkeys(re.findall(r'#(.*?)#',formula)))
+    expression = formula
+    for i,label in enumerate(labels):
+        expression = expression.replace(f'#{label}#',f'_{i}')
+
+    try:
+        tree = ast.parse(expression.strip(),mode='eval')
+    except SyntaxError as err:
+        raise ValueError(f'Invalid formula "{formula}": {err.msg}')
+
+    variables = {f'_{i}' for i in range(len(labels))}
+    pointwise = True
+    for node in ast.walk(tree):
+        if not isinstance(node,_formula_nodes):
+            raise ValueError(f'Invalid formula "{formula}": {type(node).__name__} not permitted')
+        if isinstance(node,ast.Name) and node.id not in variables|set(functions)|{'np'}:
+            raise ValueError(f'Invalid formula "{formula}": unknown name "{node.id}"')
+        if isinstance(node,ast.Attribute):
+            if node.attr not in _formula_functions or \
+               not (isinstance(node.value,ast.Name) and node.value.id == 'np' or
+                    isinstance(node.value,ast.Attribute) and node.value.attr == 'linalg'):
+                raise ValueError(f'Invalid formula "{formula}": "{node.attr}" not permitted')
+        if isinstance(node,ast.Call):
+            f = node.func
+            pointwise &= isinstance(f,ast.Attribute) and isinstance(f.value,ast.Name) and \
+                         isinstance(getattr(np,f.attr,None),np.ufunc)
+        if isinstance(node,ast.Subscript):
+            first = node.slice.elts[0] if isinstance(node.slice,ast.Tuple) else node.slice
+            pointwise &= isinstance(first,ast.Slice) and first.lower is None and first.upper is None \
+                                                     and first.step is None
+    return compile(tree,'<formula>','eval'),labels,pointwise
+
+
+def _evaluate_formula(formula,datasets,functions={},block_size=65536):
+    """
+    Evaluate a formula of Result.add_calculation.
+
+    Pointwise formulas are evaluated for blocks of points to limit the size of temporaries.
+
+    Parameters
+    ----------
+    formula : str
+        Formula to evaluate, see _compile_formula.
+    datasets : dict of numpy.ndarray
+        Data referenced in the formula.
+    functions : dict, optional
+        Permitted user functions.
+    block_size : int, optional
+        Number of points evaluated together. Defaults to 65536.
+
+    """
+    code,labels,pointwise = _compile_formula(formula,tuple(sorted(functions)))
+    namespace = dict(functions,np=np,__builtins__={})
+    data = [datasets[label] for label in labels]
+    N = min([len(d) for d in data]) if data else 0
+
+    if not pointwise or N <= block_size:
+        return np.asarray(eval(code,namespace,{f'_{i}':d for i,d in enumerate(data)}))
+
+    first = np.asarray(eval(code,namespace,{f'_{i}':d[:block_size] for i,d in enumerate(data)}))
+    result = np.empty((N,)+first.shape[1:],first.dtype)
+    result[:block_size] = first
+    for b in range(block_size,N,block_size):
+        result[b:b+block_size] = eval(code,namespace,{f'_{i}':d[b:b+block_size] for i,d in enumerate(data)})
+    return result
+
+
+_registered_functions = {}
+
+
+def _user_functions(functions):
+    """
+    Look up user functions of Result.add_calculation.
+
+    The functions are registered in the parent process before the
+    worker processes are forked and are passed to them by key only.
+    This permits functions that can not be pickled, e.g. local ones.
+
+    Parameters
+    ----------
+    functions : dict
+        Keys of the registered functions, see Result.enable_user_function.
+
+    """
+    missing = [name for name,key in functions.items() if key not in _registered_functions]
+    if missing:
+        raise RuntimeError(f'user function "{missing[0]}" not available in worker process '
+                           '(requires the "fork" start method)')
+    return {name:_registered_functions[key] for name,key in functions.items()}
+
+
+def _evaluate_jobs(jobs,available):
+    """
+    Evaluate callback functions of Result._add_generic_pointwise.
+
+    Jobs are evaluated in the given order once their input is available, i.e.
+    results of earlier jobs are used as (in-memory) input for later jobs.
+
+    Parameters
+    ----------
+    jobs : list of tuple
+        Callback function, mapping of arguments to dataset labels, and further arguments.
+    available : dict
+        Input datasets (data, label, and metadata), extended by the results.
+
+    Returns
+    -------
+    results : list of dict
+        Data, label, metadata, and index of the job of each result.
+
+    """
+    results = []
+    todo = list(range(len(jobs)))
+    while todo:
+        ready = [j for j in todo if all(label in available for label in jobs[j][1].values())]
+        if not ready: break
+        for j in ready:
+            func,datasets,args = jobs[j]
+            try:
+                r = func(**{arg:available[label] for arg,label in datasets.items()},**args)
+                r['data'] = np.asarray(r['data'])
+                available[r['label']] = r
+                results.append(dict(r,job=j))
+            except Exception as err:
+                print(f'Error during calculation: {err}.')
+            todo.remove(j)
+    return results
+
+
+def _pointwise(jobs,shared):
+    """
+    Evaluate callback functions of Result._add_generic_pointwise in a worker process.
+
+    Input is read from and output is written to shared memory, see _evaluate_jobs.
+
+    Parameters
+    ----------
+    jobs : list of tuple
+        Callback function, mapping of arguments to dataset labels, and further arguments.
+    shared : dict
+        Location, shape, data type, and metadata of the input datasets in shared memory.
+
+    """
+    shm = {label:shared_memory.SharedMemory(name=s['name']) for label,s in shared.items()}
+    results = []
+    try:
+        available = {label:{'data': np.ndarray(s['shape'],s['dtype'],buffer=shm[label].buf),
+                            'label':label,
+                            'meta': s['meta']} for label,s in shared.items()}
+        results = _evaluate_jobs(jobs,available)
+
+        out = []
+        try:
+            for r in results:
+                data = r['data']
+                o = shared_memory.SharedMemory(create=True,size=max(data.nbytes,1))
+                out.append(dict({k:v for k,v in r.items() if k != 'data'},name=o.name,shape=data.shape,dtype=data.dtype))
+                try:
+                    np.ndarray(data.shape,data.dtype,buffer=o.buf)[...] = data
+                finally:
+                    o.close()
+        except BaseException:
+            _unlink_shared(out)
+            raise
+        return out
+    finally:
+        available = results = r = data = None                                                      # release views on shared memory
+        for m in shm.values(): m.close()
+
+
+def _code_hash(func):
+    """
+    Return hash of the name and code of a function, see Result._recipe.
+
+    Functions without Python code (e.g. NumPy ufuncs) are identified by name only.
+
+    Parameters
+    ----------
+    func : callable
+        Function to hash.
+
+    """
+    def state(code):
+        return [code.co_code.hex(),code.co_names,
+                [state(c) if isinstance(c,types.CodeType) else repr(c) for c in code.co_consts]]
+
+    func = getattr(func,'__func__',func)
+    name = f'{getattr(func,"__module__",None)}.{getattr(func,"__qualname__",repr(func))}'
+    if not hasattr(func,'__code__'):
+        return name
+    closure = [repr(c.cell_contents) for c in func.__closure__ or ()]
+    return hashlib.sha1(json.dumps([name,state(func.__code__),repr(func.__defaults__),closure]).encode()).hexdigest()
+
+
+def _unlink_shared(shared):
+    """
+    Release shared memory blocks, see Result._add_pointwise.
+
+    Parameters
+    ----------
+    shared : iterable of dict
+        Descriptions of the shared memory blocks, including their name.
+
+    """
+    for s in shared:
+        try:
+            shm = shared_memory.SharedMemory(name=s['name'])
+        except FileNotFoundError:
+            continue
+        shm.close()
+        shm.unlink()
+
+
+def _deflate_chunk(data,shuffle,level):
+    """
+    Compress a chunk like the HDF5 shuffle and deflate filters, see Result.save_DADF5.
+
+    zlib releases the GIL, i.e. chunks can be compressed concurrently in threads.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Data of a complete chunk.
+    shuffle : bool
+        Apply the byte shuffle filter prior to compression.
+    level : int
+        Compression level (0-9).
+
+    """
+    raw = np.ascontiguousarray(data).view(np.uint8).reshape(-1,data.dtype.itemsize)
+    return zlib.compress((raw.T if shuffle else raw).tobytes(),level)
+
+
+_vtk_export = {}
+
+def _init_vtk_export(result,mode):
+    """Set up a worker process for Result.save_vtk."""
+    _vtk_export.clear()
+    _vtk_export['result'] = copy.copy(result)                                                       # drop inherited handle and pool
+    _vtk_export['mode'] = mode
+
+
+def _save_vtk_increment(fname,datasets):
+    """Read, assemble, and write VTK file of one increment."""
+    result = _vtk_export['result']
+    if 'geometry' not in _vtk_export:
+        _vtk_export['geometry'] = result._vtk_geometry(_vtk_export['mode']).vtk_data
+    v = VTK(_vtk_export['geometry'].NewInstance())
+    v.vtk_data.CopyStructure(_vtk_export['geometry'])
+    for name,x in datasets:
+        v.add(result.read_dataset(x,0),name)
+    v.save(fname,parallel=False)
+
+
 class Result:
     """
     Read and write to DADF5 files.
@@ -59,27 +373,23 @@ class Result:
                 self.origin = f['geometry'].attrs['origin'] if self.version_major == 0 and self.version_minor >= 5 else \
                               np.zeros(3)
 
-            r=re.compile('inc[0-9]+')
-            increments_unsorted = {int(i[3:]):i for i in f.keys() if r.match(i)}
-            self.increments     = [increments_unsorted[i] for i in sorted(increments_unsorted)]
-            self.times          = [round(f[i].attrs['time/s'],12) for i in self.increments]
+            self.increments     = self._find_increments(f)
+            self._times         = None                                                              # read on first access
 
             self.Nmaterialpoints, self.Nconstituents =   np.shape(f['mapping/cellResults/constituent'])
-            self.materialpoints  = [m.decode() for m in np.unique(f['mapping/cellResults/materialpoint']['Name'])]
-            self.constituents    = [c.decode() for c in np.unique(f['mapping/cellResults/constituent']  ['Name'])]
-
-            # faster, but does not work with (deprecated) DADF5_postResults
-            #self.materialpoints  = [m for m in f['inc0/materialpoint']]
-            #self.constituents    = [c for c in f['inc0/constituent']]
+            self.materialpoints  = self._find_names(f,self.increments[0],'materialpoint')
+            self.constituents    = self._find_names(f,self.increments[0],'constituent')
 
             self.con_physics = []
-            for c in self.constituents:
-                self.con_physics += f['/'.join([self.increments[0],'constituent',c])].keys()
+            for c in self.constituents:                                                             # extracted files might lack some groups
+                if '/'.join([self.increments[0],'constituent',c]) in f:
+                    self.con_physics += f['/'.join([self.increments[0],'constituent',c])].keys()
             self.con_physics = list(set(self.con_physics))                                          # make unique
 
             self.mat_physics = []
             for m in self.materialpoints:
-                self.mat_physics += f['/'.join([self.increments[0],'materialpoint',m])].keys()
+                if '/'.join([self.increments[0],'materialpoint',m]) in f:
+                    self.mat_physics += f['/'.join([self.increments[0],'materialpoint',m])].keys()
             self.mat_physics = list(set(self.mat_physics))                                          # make unique
 
         self.selection = {'increments':     self.increments,
@@ -91,23 +401,72 @@ class Result:
 
         self._allow_modification = False
 
+        self._handle = None
+        self._handle_cache = None
 
-    def __repr__(self):
-        """Show summary of file content."""
-        all_selected_increments = self.selection['increments']
+        self._index = None
+        self._mapping = None
+        self._scatter = {}
+        self._cache = None
+        self._operator = None
+        self._deformed = {}
+
+        self._pool = None
+        self._N_workers = 0
+        self._block_size = 65536
+        self._jobs = None
+        self._user_functions = {}
+
+        self._storage = {'chunk_size':  1024**2,
+                         'compression': 'gzip',
+                         'level':       4,
+                         'shuffle':     True,
+                         'float32':     False}
+
+
+    def __enter__(self):
+        """Keep the DADF5 file open for reading during a session."""
+        self.open()
+        return self
 
-        self.pick('increments',all_selected_increments[0:1])
-        first = self.list_data()
 
-        self.pick('increments',all_selected_increments[-1:])
-        last  = '' if len(all_selected_increments) < 2 else self.list_data()
+    def __exit__(self,*exc):
+        """Close the DADF5 file and stop worker processes at the end of a session."""
+        self.close()
+        self._close_pool()
 
-        self.pick('increments',all_selected_increments)
 
-        in_between = '' if len(all_selected_increments) < 3 else \
-                     ''.join([f'\n{inc}\n  ...\n' for inc in all_selected_increments[1:-2]])
+    def __del__(self):
+        """Stop worker processes."""
+        if getattr(self,'_pool',None) is not None: self._close_pool()
 
-        return util.srepr(first + in_between + last)
+
+    def __getstate__(self):
+        """Exclude open file handles and worker processes when pickling, e.g. for multiprocessing."""
+        state = self.__dict__.copy()
+        state['_handle'] = None
+        state['_pool'] = None
+        state['_cache'] = None
+        state['_deformed'] = {}
+        return state
+
+
+    def __repr__(self):
+        """Show summary of file content, see list_data for the datasets."""
+        selected = self.selection['increments']
+        times = dict(zip(selected[:1]+selected[-1:],self._times_of(selected[:1]+selected[-1:])))
+
+        summary = [f'{self.fname.name} (DADF5 v{self.version_major}.{self.version_minor})']
+        if self.structured:
+            summary.append(f'grid: {" x ".join(map(str,self.grid))}, size: {" x ".join(map(str,self.size))} m')
+        summary.append(f'{self.Nmaterialpoints} materialpoints, {self.Nconstituents} constituent(s) each')
+        summary.append(f'increments: {len(selected)} of {len(self.increments)} selected'
+                       + ('' if len(selected) == 0 else
+                          f', {" ... ".join([f"{i} ({t}s)" for i,t in times.items()])}'))
+        for o,p in zip(['constituents','materialpoints'],['con_physics','mat_physics']):
+            summary.append(f'{o}: {", ".join(self.selection[o])} ({", ".join(sorted(self.selection[p]))})')
+
+        return util.srepr(summary)
 
 
     def _manage_selection(self,action,what,datasets):
@@ -166,6 +525,289 @@ class Result:
             self.selection[what] = diff_sorted
 
 
+    def open(self,cache_size=64*1024**2,cache_slots=10007):
+        """
+        Open the DADF5 file for reading until 'close' is called.
+
+        All methods reuse the persistent handle instead of opening the file on each
+        access. Using the Result object as context manager, i.e. 'with Result(fname) as r:',
+        opens and closes the file automatically.
+
+        Parameters
+        ----------
+        cache_size : int, optional
+            Size of the chunk cache in bytes. Defaults to 64 MiB.
+        cache_slots : int, optional
+            Number of chunk slots in the cache (preferably a prime number). Defaults to 10007.
+
+        """
+        if self._handle is None:
+            self._handle = h5py.File(self.fname,'r',rdcc_nbytes=cache_size,rdcc_nslots=cache_slots)
+            self._handle_cache = {'cache_size':cache_size,'cache_slots':cache_slots}
+
+
+    def close(self):
+        """Close the persistent handle of the DADF5 file."""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+    @staticmethod
+    def _find_names(f,increment,kind):
+        """
+        Return names of the constituents or materialpoints with results.
+
+        The names are taken from the groups of the first increment, which is
+        much faster than scanning the mapping. Groups without cells (empty
+        datasets) are skipped. The mapping is used if the groups are missing
+        (e.g. deprecated DADF5_postResults) or do not contain any dataset.
+        """
+        names = []
+        for name,group in f[increment].get(kind,{}).items():
+            rows = None
+            for physics in group.values():
+                rows = next((d.shape[0] for d in physics.values() if isinstance(d,h5py.Dataset)),None)
+                if rows is not None: break
+            if rows is None:
+                names = []
+                break
+            if rows > 0: names.append(name)
+        return sorted(names) if names else \
+               [n.decode() for n in np.unique(f[f'mapping/cellResults/{kind}']['Name'])]
+
+
+    @property
+    def times(self):
+        """Times of the increments."""
+        if self._times is None:
+            with self._read() as f:
+                self._times = [round(f[i].attrs['time/s'],12) for i in self.increments]
+        return self._times
+
+
+    def _times_of(self,increments):
+        """Return times of the given increments, reading only their attributes if the times are not loaded."""
+        if self._times is not None:
+            return [self._times[self.increments.index(i)] for i in increments]
+        with self._read() as f:
+            return [round(f[i].attrs['time/s'],12) for i in increments]
+
+
+    @staticmethod
+    def _find_increments(f):
+        """Return names of all increments in a DADF5 file, sorted by number."""
+        r=re.compile('inc[0-9]+')
+        increments_unsorted = {int(i[3:]):i for i in f.keys() if r.match(i)}
+        return [increments_unsorted[i] for i in sorted(increments_unsorted)]
+
+
+    def _refresh(self):
+        """
+        Read increments that were written to the DADF5 file since it was opened.
+
+        The previously last increment is indexed again since it might have
+        been incomplete when it was indexed.
+
+        Returns
+        -------
+        increments : list of str
+            Names of the new increments.
+
+        """
+        handle_cache = self._handle_cache if self._handle is not None else None
+        self.close()                                                                                # metadata of handle is outdated
+        try:
+            f = h5py.File(self.fname,'r',swmr=True)
+        except (OSError,ValueError):
+            f = h5py.File(self.fname,'r')
+        with f:
+            new = [i for i in self._find_increments(f) if i not in self.increments]
+            if self._index is not None:
+                for i in self.increments[-1:]+new:
+                    self._index.update(self._index_increment(f,i))
+            self.increments = self.increments + new
+            if self._times is not None:
+                self._times = self._times + [round(f[i].attrs['time/s'],12) for i in new]
+        if handle_cache is not None:
+            self.open(**handle_cache)
+        return new
+
+
+    def follow(self,quantities=[],interval=10.0,timeout=None):
+        """
+        Follow a DADF5 file that is written by a running simulation.
+
+        Every increment, including those existing already, is visited once in order.
+        An increment is considered complete as soon as the next increment appears
+        or if no new increment was written within 'timeout' seconds, which
+        ends following. During each iteration, only the current increment is
+        selected and the given derived quantities are already added, i.e.
+        exports and further processing in the body of the loop are limited to it.
+        Adding is retried every 'interval' seconds while the simulation locks
+        the file, but for at most 'timeout' seconds.
+
+        Parameters
+        ----------
+        quantities : list of tuple, optional
+            Quantities to add to each increment, see add_multiple.
+        interval : float, optional
+            Time in seconds between checks for new increments. Defaults to 10.
+        timeout : float, optional
+            Time in seconds without new increment after which following ends.
+            Defaults to None, i.e. following continues until the loop is left.
+
+        Yields
+        ------
+        increment : str
+            Name of the current increment.
+
+        Examples
+        --------
+        Add the von Mises equivalent Cauchy stress to each new increment of a
+        running simulation and export it for visualization.
+
+        >>> r = damask.Result('my_simulation.hdf5')
+        >>> for inc in r.follow([('Cauchy',{}),('Mises',{'T_sym':'sigma'})],timeout=3600):
+        ...     r.save_vtk('sigma_vM')
+
+        """
+        selection = self.selection['increments']
+        N_visited = 0
+        last_change = time.monotonic()
+        try:
+            while True:
+                try:
+                    if self._refresh(): last_change = time.monotonic()
+                except OSError:                                                                     # file is locked by the simulation
+                    pass
+                finished = timeout is not None and time.monotonic()-last_change > timeout
+                while len(self.increments)-N_visited > (0 if finished else 1):                      # last increment might be incomplete
+                    increment = self.increments[N_visited]
+                    self.pick('increments',[increment])
+                    locked = time.monotonic()
+                    while quantities:
+                        try:
+                            self.add_multiple(quantities)
+                            break
+                        except OSError:                                                             # file is locked by the simulation
+                            if timeout is not None and time.monotonic()-locked > timeout: raise
+                            time.sleep(interval)
+                    N_visited += 1
+                    yield increment
+                if finished: break
+                time.sleep(interval)
+        finally:
+            self.pick('increments',selection)
+
+
+    @contextmanager
+    def _read(self):
+        """Provide the persistent handle or temporarily open the DADF5 file for reading."""
+        if self._handle is not None:
+            yield self._handle
+        else:
+            with h5py.File(self.fname,'r') as f:
+                yield f
+
+
+    @contextmanager
+    def _suspend(self):
+        """Temporarily close a persistent handle, e.g. before modification or forking."""
+        session = self._handle is not None
+        if session: self.close()
+        try:
+            yield
+        finally:
+            if session: self.open(**self._handle_cache)
+
+
+    @contextmanager
+    def _write(self):
+        """Open the DADF5 file for modification, suspending a persistent read handle."""
+        if self._cache is not None:                                                                 # datasets might be overwritten
+            self._cache['size'] = 0
+            self._cache['data'].clear()
+        self._deformed = {}
+        with self._suspend(), h5py.File(self.fname,'a') as f:
+            self._handle = f
+            try:
+                yield f
+            finally:
+                self._handle = None
+
+
+    def set_storage(self,**policy):
+        """
+        Set storage policy for datasets added by add_* functions.
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            Target size of a chunk in bytes. Chunks extend over complete cells
+            and contain at least one cell. Defaults to 1 MiB.
+        compression : {'gzip', 'lzf', None}, optional
+            Compression filter. Defaults to 'gzip'.
+        level : int, optional
+            Compression level (0-9) for 'gzip'. Defaults to 4.
+        shuffle : bool, optional
+            Apply the byte shuffle filter prior to compression. Defaults to True.
+        float32 : bool, optional
+            Store floating point data with single precision. Defaults to False.
+
+        """
+        for k,v in policy.items():
+            if k not in self._storage:
+                raise KeyError(f'Invalid storage parameter "{k}"')
+            if k == 'compression' and v not in ['gzip','lzf',None]:
+                raise ValueError(f'Invalid compression filter "{v}"')
+        self._storage.update(policy)
+
+
+    @contextmanager
+    def storage(self,**policy):
+        """
+        Temporarily set storage policy for datasets added by add_* functions.
+
+        Parameters
+        ----------
+        **policy
+            See set_storage.
+
+        Examples
+        --------
+        Store the Mises stress with single precision using the LZF filter.
+
+        >>> with r.storage(compression='lzf',float32=True):
+        ...     r.add_Mises('sigma')
+
+        """
+        previous = self._storage.copy()
+        self.set_storage(**policy)
+        try:
+            yield
+        finally:
+            self._storage = previous
+
+
+    def _storage_options(self,shape,dtype):
+        """Return keyword arguments for h5py.Group.create_dataset according to the storage policy."""
+        dtype = np.dtype(np.float32) if self._storage['float32'] and np.issubdtype(dtype,np.floating) else \
+                np.dtype(dtype)
+        if len(shape) == 0 or 0 in shape:
+            return {'dtype': dtype}                                                                 # chunks must not exceed shape
+        cell  = dtype.itemsize*int(np.prod(shape[1:]))
+        rows  = max(1,min(self._storage['chunk_size']//cell,shape[0]))
+        options = {'dtype':   dtype,
+                   'chunks':  (rows,)+tuple(shape[1:]),
+                   'shuffle': self._storage['shuffle'] and self._storage['compression'] is not None}
+        if self._storage['compression'] is not None:
+            options['compression'] = self._storage['compression']
+            if self._storage['compression'] == 'gzip':
+                options['compression_opts'] = self._storage['level']
+        return options
+
+
     def allow_modification(self):
         print(util.bcolors().WARNING+util.bcolors().BOLD+
               'Warning: Modification of existing datasets allowed!'+
@@ -276,13 +918,17 @@ class Result:
 
         """
         if self._allow_modification:
-            with h5py.File(self.fname,'a') as f:
+            with self._write() as f:
                 for path_old in self.get_dataset_location(name_old):
                     path_new = os.path.join(os.path.dirname(path_old),name_new)
                     f[path_new] = f[path_old]
                     f[path_new].attrs['Renamed'] = f'Original name: {name_old}' if h5py3 else \
                                                    f'Original name: {name_old}'.encode()
+                    if 'Fingerprint' in f[path_new].attrs:                                          # recipe yields name_old
+                        del f[path_new].attrs['Fingerprint']
                     del f[path_old]
+                    self._index[os.path.dirname(path_old)].pop(name_old)
+                    self._index[os.path.dirname(path_old)][name_new] = self._dataset_info(f[path_new])
         else:
             raise PermissionError('Rename operation not permitted')
 
@@ -318,42 +964,20 @@ class Result:
         sets = datasets if hasattr(datasets,'__iter__') and not isinstance(datasets,str) \
          else [datasets]
         tag = f'#{component}' if tagged else ''
-        tbl = {} if split else None
-        inGeom = {}
-        inData = {}
-        with h5py.File(self.fname,'r') as f:
-            for dataset in sets:
-                for group in self.groups_with_datasets(dataset):
-                    path = os.path.join(group,dataset)
-                    inc,prop,name,cat,item = (path.split('/') + ['']*5)[:5]
-                    key = '/'.join([prop,name+tag])
-                    if key not in inGeom:
-                        if prop == 'geometry':
-                            inGeom[key] = inData[key] = np.arange(self.Nmaterialpoints)
-                        elif prop == 'constituent':
-                            inGeom[key] = np.where(f['mapping/cellResults/constituent'][:,component]['Name'] == str.encode(name))[0]
-                            inData[key] =          f['mapping/cellResults/constituent'][inGeom[key],component]['Position']
-                        else:
-                            inGeom[key] = np.where(f['mapping/cellResults/materialpoint']['Name'] == str.encode(name))[0]
-                            inData[key] =          f['mapping/cellResults/materialpoint'][inGeom[key].tolist()]['Position']
-                    shape = np.shape(f[path])
-                    data = np.full((self.Nmaterialpoints,) + (shape[1:] if len(shape)>1 else (1,)),
-                                   np.nan,
-                                   dtype=np.dtype(f[path]))
-                    data[inGeom[key]] = (f[path] if len(shape)>1 else np.expand_dims(f[path],1))[inData[key]]
-                    path = (os.path.join(*([prop,name]+([cat] if cat else [])+([item] if item else []))) if split else path)+tag
-                    if split:
-                        try:
-                            tbl[inc].add(path,data)
-                        except KeyError:
-                            tbl[inc] = Table(data.reshape(self.Nmaterialpoints,-1),{path:data.shape[1:]})
-                    else:
-                        try:
-                            tbl.add(path,data)
-                        except AttributeError:
-                            tbl = Table(data.reshape(self.Nmaterialpoints,-1),{path:data.shape[1:]})
-
-        return tbl
+        columns = {}
+        for dataset in sets:
+            for group in self.groups_with_datasets(dataset):
+                path = os.path.join(group,dataset)
+                inc,prop,name,cat,item = (path.split('/') + ['']*5)[:5]
+                data = self.read_dataset([path],component)[:self.Nmaterialpoints]
+                if data.ndim == 1: data = data.reshape(-1,1)
+                path = (os.path.join(*([prop,name]+([cat] if cat else [])+([item] if item else []))) if split else path)+tag
+                columns.setdefault(inc if split else None,{})[path] = data
+
+        tbl = {k:Table(np.hstack([d.reshape(self.Nmaterialpoints,-1) for d in v.values()]),    # assemble once
+                       {p:d.shape[1:] for p,d in v.items()})
+               for k,v in columns.items()}
+        return tbl if split else tbl.get(None)
 
 
     def groups_with_datasets(self,datasets):
@@ -384,137 +1008,836 @@ class Result:
             datasets = ['*','*'] does not match a group with ['F','P','sigma']
             datasets = ['*','*','*'] matches a group with ['F','P','sigma']
 
-        """
-        if datasets is False: return []
+        """
+        if datasets is False: return []
+
+        sets = datasets if isinstance(datasets,bool) or (hasattr(datasets,'__iter__') and not isinstance(datasets,str)) else \
+              [datasets]
+        if sets is True: return self._selected_groups()
+
+        sets  = tuple(sets)
+        index = self._get_index()
+        return [group for group in self._selected_groups() if _match_all(tuple(index[group]),sets)]
+
+
+    def list_data(self):
+        """Return information on all active datasets in the file."""
+        index = self._get_index()
+        message = ''
+        for i in self.selection['increments']:
+            message += f'\n{i} ({self.times[self.increments.index(i)]}s)\n'
+            for o,p in zip(['constituents','materialpoints'],['con_physics','mat_physics']):
+                message += f'  {o[:-1]}\n'
+                for oo in self.selection[o]:
+                    message += f'    {oo}\n'
+                    for pp in self.selection[p]:
+                        message += f'      {pp}\n'
+                        group = '/'.join([i,o[:-1],oo,pp])                                          # o[:-1]: plural/singular issue
+                        for d,info in index.get(group,{}).items():
+                            unit = f" / {info['unit']}" if info['unit'] is not None else ''
+                            if info['description'] is not None:
+                                message += f"        {d}{unit}: {info['description']}\n"
+        return message
+
+
+    def get_dataset_location(self,label):
+        """Return the location of all active datasets with given label."""
+        index = self._get_index()
+        path = []
+        for i in self.selection['increments']:
+            if label in index.get(f'{i}/geometry',{}):
+                path.append(f'{i}/geometry/{label}')
+            path += [f'{group}/{label}' for group in self._selected_groups([i]) if label in index[group]]
+        return path
+
+
+    def _selected_groups(self,increments=None):
+        """
+        Return existing groups within the current selection.
+
+        Parameters
+        ----------
+        increments : list of str, optional
+            Increments to consider. Defaults to the selected increments.
+
+        """
+        index = self._get_index()
+        groups = []
+        for i in self.selection['increments'] if increments is None else increments:
+            for o,p in zip(['constituents','materialpoints'],['con_physics','mat_physics']):
+                groups += [g for g in ['/'.join([i,o[:-1],oo,pp]) for oo in self.selection[o]
+                                                                     for pp in self.selection[p]]
+                           if g in index]
+        return groups
+
+
+    def _get_index(self):
+        """Return index of all datasets in the file, build it on first access."""
+        if self._index is None:
+            self._index = {}
+            with self._read() as f:
+                for i in self.increments:
+                    self._index.update(self._index_increment(f,i))
+        return self._index
+
+
+    @staticmethod
+    def _index_increment(f,increment):
+        """Return index of all datasets of an increment."""
+        index = {}
+        for group in [f'{increment}/geometry'] + \
+                     ['/'.join([increment,o,oo,pp]) for o in ['constituent','materialpoint'] if o in f[increment]
+                                                    for oo in f[increment][o] for pp in f['/'.join([increment,o,oo])]]:
+            if group in f:
+                index[group] = {d:Result._dataset_info(v) for d,v in f[group].items()
+                                if isinstance(v,h5py.Dataset)}
+        return index
+
+
+    @staticmethod
+    def _dataset_info(dataset):
+        """Return shape, data type, unit, and description of a dataset."""
+        info = {'shape': dataset.shape,
+                'dtype': dataset.dtype}
+        for a in ['Unit','Description','Created','Fingerprint']:
+            if a in dataset.attrs:
+                info[a.lower()] = dataset.attrs[a] if h5py3 else \
+                                  dataset.attrs[a].decode()
+            else:
+                info[a.lower()] = None
+        return info
+
+
+    def _get_mapping(self,kind,name,c=0):
+        """
+        Return cells of a constituent or materialpoint and their positions in the respective datasets.
+
+        The mapping tables are read once and stored with the names factorized to
+        small integers; the gather/scatter indices are cached for each name.
+
+        Parameters
+        ----------
+        kind : str
+            Either 'constituent' or 'materialpoint'.
+        name : str
+            Name of the constituent or materialpoint.
+        c : int, optional
+            Constituent (homogenization component). Defaults to 0.
+
+        """
+        key = (kind,name,c if kind == 'constituent' else 0)
+        if key not in self._scatter:
+            mapping = self._get_mapping_table(kind)
+            ID       = mapping['ID']       if kind == 'materialpoint' else mapping['ID'][:,c]
+            position = mapping['Position'] if kind == 'materialpoint' else mapping['Position'][:,c]
+            try:
+                cells = np.where(ID == mapping['names'].index(name))[0]
+            except ValueError:
+                cells = np.empty(0,dtype=np.int64)
+            self._scatter[key] = (cells,position[cells])
+
+        return self._scatter[key]
+
+
+    def _get_mapping_table(self,kind):
+        """
+        Return mapping table of constituents or materialpoints, read it on first access.
+
+        Parameters
+        ----------
+        kind : str
+            Either 'constituent' or 'materialpoint'.
+
+        """
+        if self._mapping is None:
+            self._mapping = {}
+            with self._read() as f:
+                for k in ['constituent','materialpoint']:
+                    table = f[f'mapping/cellResults/{k}'][()]
+                    names,idx = np.unique(table['Name'],return_inverse=True)
+                    self._mapping[k] = {'names':    [n.decode() for n in names],
+                                        'ID':       idx.reshape(table.shape).astype(np.min_scalar_type(len(names))),
+                                        'Position': table['Position']}
+        return self._mapping[kind]
+
+
+    def get_constituent_ID(self,c=0):
+        """Pointwise constituent ID."""
+        mapping = self._get_mapping_table('constituent')
+        IDs = np.array([int(n.split('_')[0]) for n in mapping['names']],dtype=np.int32)
+        return IDs[mapping['ID'][:,c]]
+
+
+    def get_crystal_structure(self):                                                                # ToDo: extension to multi constituents/phase
+        """Info about the crystal structure."""
+        with self._read() as f:
+            return f[self.get_dataset_location('O')[0]].attrs['Lattice'] if h5py3 else \
+                   f[self.get_dataset_location('O')[0]].attrs['Lattice'].decode()
+
+
+    def enable_user_function(self,func):
+        """
+        Permit the use of a function in add_calculation.
+
+        Parameters
+        ----------
+        func : function
+            Function to be used in formulas under its name.
+
+        """
+        key = _code_hash(func)
+        _registered_functions[key] = func                                                           # forked workers inherit the registry
+        self._user_functions[func.__name__] = key
+        self._close_pool()                                                                          # workers need to know the function
+        print(f'Function {func.__name__} enabled in add_calculation.')
+
+
+    def enable_cache(self,budget=256*1024**2):
+        """
+        Keep datasets returned by read_dataset in memory.
+
+        The least recently used datasets are evicted once the budget is
+        exceeded. The cache is cleared whenever the DADF5 file is modified.
+        Cached datasets are not copied, i.e. read_dataset returns read-only arrays.
+
+        Parameters
+        ----------
+        budget : int, optional
+            Maximum size of the cached datasets in bytes. Defaults to 256 MiB.
+
+        """
+        if self._cache is None:
+            self._cache = {'data':collections.OrderedDict(),'size':0,'hits':0,'misses':0,'evictions':0}
+        self._cache['budget'] = budget
+        self._evict()
+
+
+    def disable_cache(self):
+        """Discard the cached datasets and stop caching."""
+        self._cache = None
+
+
+    def cache_info(self):
+        """
+        Return statistics of the dataset cache.
+
+        Returns
+        -------
+        info : dict
+            Number of hits, misses, evictions, and entries as well as
+            size and budget in bytes. None if caching is disabled.
+
+        """
+        return None if self._cache is None else \
+               {**{k:v for k,v in self._cache.items() if k != 'data'},'entries':len(self._cache['data'])}
+
+
+    def _evict(self):
+        """Remove least recently used datasets from the cache until it fits into the budget."""
+        while self._cache['size'] > self._cache['budget']:
+            _,dataset = self._cache['data'].popitem(last=False)
+            self._cache['size'] -= dataset.nbytes
+            self._cache['evictions'] += 1
+
+
+    def read_dataset(self,path,c=0,plain=False,cells=None):
+        """
+        Dataset for all points/cells.
+
+        If more than one path is given, the dataset is composed of the individual contributions.
+        If cells are given, e.g. a region of interest (see region), only the respective rows
+        are read. For geometry datasets, 'cells' refers to the rows, i.e. nodes for 'u_n'.
+        If caching is enabled (see enable_cache), repeated reads are served from memory
+        and cached datasets are returned as read-only arrays.
+        """
+        if self._cache is not None:
+            key = (tuple(path),c,None if cells is None else
+                   hashlib.sha1(np.ascontiguousarray(cells,dtype=np.int64)).hexdigest())
+            if key in self._cache['data']:
+                self._cache['hits'] += 1
+                self._cache['data'].move_to_end(key)
+                dataset = self._cache['data'][key]
+                return dataset.view(('float64',len(dataset.dtype.names))) if plain and dataset.dtype.names is not None else \
+                       dataset
+            self._cache['misses'] += 1
+
+        with self._read() as f:
+            if path[0].split('/')[1] == 'geometry':
+                dataset = np.array(f[path[-1]]) if cells is None else \
+                          self._read_rows(f[path[-1]],np.asarray(cells))
+            else:
+                _,dataset = next(self.read_dataset_blocks(path,c,block_size=None,cells=cells))            # single block
+
+        if self._cache is not None and dataset.nbytes <= self._cache['budget']:
+            dataset.flags.writeable = False                                                         # shared by all hits
+            self._cache['data'][key] = dataset
+            self._cache['size'] += dataset.nbytes
+            self._evict()
+
+        if plain and dataset.dtype.names is not None:
+            return dataset.view(('float64',len(dataset.dtype.names)))
+        else:
+            return dataset
+
+
+    def view(self,label,c=0,plain=False):
+        """
+        Lazy view of a dataset for the selected increments.
+
+        Parameters
+        ----------
+        label : str
+            Label of the dataset.
+        c : int, optional
+            Constituent to consider. Defaults to 0.
+        plain : bool, optional
+            Treat structured data (e.g. orientations) as plain float array. Defaults to False.
+
+        Returns
+        -------
+        view : damask.DatasetView
+            View of shape (N_increments,N_cells,...). For geometry datasets,
+            the second axis refers to the rows, i.e. nodes for 'u_n'.
+
+        Examples
+        --------
+        Average stress of the last 20 increments and strain history of the first cell.
+
+        >>> P = r.view('P')
+        >>> P_avg = P[-20:].mean(axis=0)
+        >>> F_0 = r.view('F')[:,0].compute()
+
+        """
+        locations = self.get_dataset_location(label)
+        paths = {i:[l for l in locations if l.split('/')[0] == i] for i in self.selection['increments']}
+        if len(paths) == 0 or not all(paths.values()):
+            raise ValueError(f'dataset "{label}" not found in all selected increments')
+        return DatasetView(self,label,paths,c,plain)
+
+
+    def read_dataset_blocks(self,path,c=0,plain=False,block_size=65536,cells=None):
+        """
+        Dataset for all points/cells in blocks of consecutive cells.
+
+        Only the rows of the source datasets that are needed for the current
+        block are read (using hyperslab selections), hence, the memory
+        consumption is limited by the block size rather than by the number
+        of cells.
+
+        Parameters
+        ----------
+        path : list of str
+            Location of the dataset(s), e.g. as returned by get_dataset_location.
+            If more than one path is given, the dataset is composed of the individual contributions.
+        c : int, optional
+            Constituent (homogenization component) to consider. Defaults to 0.
+        plain : bool, optional
+            Return structured data (e.g. orientations) as plain float array. Defaults to False.
+        block_size : int, optional
+            Number of cells per block. Defaults to 65536.
+            Geometry datasets are split into blocks of rows.
+            If None, all cells are contained in a single block.
+        cells : numpy.ndarray of int, optional
+            Cells (or rows for geometry datasets) to read, e.g. a region of interest.
+            Defaults to all cells.
+
+        Yields
+        ------
+        cells : slice or numpy.ndarray of int
+            Range of cells (or rows for geometry datasets) contained in the block,
+            indices of the cells if cells are given.
+        data : numpy.ndarray
+            Data of the cells in the block.
+
+        """
+        with self._read() as f:
+            if path[0].split('/')[1] == 'geometry':
+                N = f[path[-1]].shape[0] if cells is None else len(cells)
+                for i in range(0,N,max(N,1) if block_size is None else block_size):
+                    if cells is None:
+                        rows = slice(i,min(i+(N if block_size is None else block_size),N))
+                        yield rows, f[path[-1]][rows]
+                    else:
+                        rows = np.asarray(cells)[i:i+(N if block_size is None else block_size)]
+                        yield rows, self._read_rows(f[path[-1]],rows)
+                return
+
+            shape = np.shape(f[path[0]])[1:]
+            if len(shape) == 0: shape = (1,)
+            dtype = np.dtype(f[path[0]])
+
+            N = self.Nmaterialpoints if cells is None else len(cells)
+            for i in range(0,N,max(N,1) if block_size is None else block_size):
+                if cells is None:
+                    block_cells = slice(i,min(i+(N if block_size is None else block_size),N))
+                    block = np.full((block_cells.stop-block_cells.start,)+shape,np.nan,dtype=dtype)
+                else:
+                    block_cells = np.asarray(cells)[i:i+(N if block_size is None else block_size)]
+                    block = np.full((len(block_cells),)+shape,np.nan,dtype=dtype)
+                for pa in path:
+                    kind,label = pa.split('/')[1:3]
+                    p,u = self._get_mapping(kind,label,c)
+                    if cells is None:
+                        s,e = np.searchsorted(p,[block_cells.start,block_cells.stop])
+                        if e > s:
+                            block[p[s:e]-block_cells.start] = self._read_rows(f[pa],u[s:e]).reshape((e-s,)+shape)
+                    else:
+                        j = np.clip(np.searchsorted(p,block_cells),0,max(len(p)-1,0))
+                        found = p[j] == block_cells if len(p) > 0 else np.zeros(len(block_cells),bool)
+                        if np.any(found):
+                            block[found] = self._read_rows(f[pa],u[j[found]]).reshape((np.count_nonzero(found),)+shape)
+
+                if plain and block.dtype.names is not None:
+                    yield block_cells, block.view(('float64',len(block.dtype.names)))
+                else:
+                    yield block_cells, block
+
+
+    @staticmethod
+    def _read_rows(dataset,rows,max_gap=1024):
+        """
+        Read selected rows of an HDF5 dataset.
+
+        Rows that are close to each other are read together via a single
+        hyperslab selection.
+
+        Parameters
+        ----------
+        dataset : h5py.Dataset
+            Dataset to read from.
+        rows : numpy.ndarray of int
+            Rows to read, in arbitrary order and potentially with duplicates.
+        max_gap : int, optional
+            Maximum number of unneeded rows between needed rows that
+            are read within a single selection. Defaults to 1024.
+            Selections of which less than 1/16 of the rows is needed
+            are read as point selections.
+
+        """
+        if len(rows) == 0:
+            return np.empty((0,)+dataset.shape[1:],dtype=dataset.dtype)
+
+        unique,inverse = np.unique(rows,return_inverse=True)
+        runs = np.split(unique,np.where(np.diff(unique) > max_gap)[0]+1)
+        return np.concatenate([dataset[r[0]:r[-1]+1][r-r[0]] if len(r)*16 > r[-1]-r[0] else
+                               dataset[r]                                                           # sparse rows, e.g. plane
+                               for r in runs])[inverse]
+
+
+    def probe(self,label,cells=None,coordinates=None,c=0,plain=False):
+        """
+        History of a dataset at selected cells for all selected increments.
+
+        Only the rows of the datasets that belong to the requested cells are read.
+
+        Parameters
+        ----------
+        label : str
+            Label of the dataset.
+        cells : int or iterable of int, optional
+            Indices of the cells to probe.
+        coordinates : numpy.ndarray of shape (:,3), optional
+            Coordinates of the points to probe. Points are assigned to the
+            cell that contains them (grid) or to the cell with the nearest
+            center (mesh). Mutually exclusive with cells.
+        c : int, optional
+            Constituent (homogenization component) to consider. Defaults to 0.
+        plain : bool, optional
+            Return structured data (e.g. orientations) as plain float array. Defaults to False.
+        Returns
+        -------
+        history : numpy.ndarray of shape (N_increments,N_points,...)
+            Data at the probed cells, NaN where the dataset does not exist.
+
+        """
+        if (cells is None) == (coordinates is None):
+            raise ValueError('Specify either cells or coordinates')
+
+        cells = np.atleast_1d(cells).astype(np.int64) if coordinates is None else \
+                self._cells_at(np.array(coordinates).reshape(-1,3))
+
+        with self._read() as f:
+            increments = self.selection['increments']
+            locations  = self.get_dataset_location(label)
+            if len(locations) == 0:
+                raise ValueError(f'Dataset "{label}" not found')
+            paths = {i:[p for p in locations if p.split('/')[0] == i] for i in increments}
+            info  = self._get_index()[os.path.dirname(locations[0])][label]
+            shape = info['shape'][1:] if len(info['shape']) > 1 else (1,)
+
+            gather = {}                                                                             # rows of each group at the probed cells
+            for pa in locations:
+                kind,name = pa.split('/')[1:3]
+                if (kind,name) in gather: continue
+                if kind == 'geometry':
+                    gather[(kind,name)] = (np.arange(len(cells)),cells)
+                else:
+                    p,u = self._get_mapping(kind,name,c)
+                    i = np.clip(np.searchsorted(p,cells),0,max(len(p)-1,0))
+                    found = np.where(p[i] == cells)[0] if len(p) > 0 else np.empty(0,dtype=np.int64)
+                    gather[(kind,name)] = (found,u[i[found]])
+
+            history = np.full((len(increments),len(cells))+shape,np.nan,dtype=info['dtype'])
+            for j,inc in enumerate(increments):
+                for pa in paths[inc]:
+                    points,rows = gather[tuple(pa.split('/')[1:3])]
+                    history[j,points] = self._read_rows(f[pa],rows).reshape((len(points),)+shape)
+
+        if plain and history.dtype.names is not None:
+            return history.view(('float64',len(history.dtype.names)))
+        else:
+            return history
+
 
-        sets = datasets if isinstance(datasets,bool) or (hasattr(datasets,'__iter__') and not isinstance(datasets,str)) else \
-              [datasets]
+    def statistics(self,label,percentiles=[],bins=None,value_range=None,grouped=False,block_size=65536):
+        """
+        Calculate statistics of a dataset for each selected increment.
 
-        groups = []
+        The datasets are read in blocks and all quantities are accumulated in a
+        single pass (mean and variance are merged with the algorithm of Chan et al.),
+        i.e. the memory consumption is limited by the block size. Percentiles and
+        histograms require a second pass, the latter only if 'value_range' is not given.
+        All statistics are calculated component-wise. Since all cells of a grid have
+        the same volume, the mean corresponds to the volume average for grid solver results.
 
-        with h5py.File(self.fname,'r') as f:
-            for i in self.iterate('increments'):
-                for o,p in zip(['constituents','materialpoints'],['con_physics','mat_physics']):
-                    for oo in self.iterate(o):
-                        for pp in self.iterate(p):
-                            group = '/'.join([i,o[:-1],oo,pp])                                      # o[:-1]: plural/singular issue
-                            if sets is True:
-                                groups.append(group)
-                            else:
-                                if group in f.keys():
-                                    match = [e for e_ in [glob.fnmatch.filter(f[group].keys(),s) for s in sets] for e in e_]
-                                    if len(set(match)) == len(sets): groups.append(group)
-        return groups
+        Parameters
+        ----------
+        label : str
+            Label of the dataset.
+        percentiles : sequence of float, optional
+            Percentiles to compute, in the range [0,100]. The percentiles are approximated
+            by interpolation of a histogram with 4096 bins spanning the value range.
+        bins : int, optional
+            Number of bins of the histograms. Defaults to None, i.e. no histograms.
+        value_range : tuple of float, optional
+            Lower and upper limit of the histogram bins. Defaults to the
+            minimum and maximum value of each increment and component.
+        grouped : bool, optional
+            Calculate statistics separately for each constituent and materialpoint.
+            Defaults to False.
+        block_size : int, optional
+            Number of points read at once. Defaults to 65536.
+
+        Returns
+        -------
+        statistics : dict
+            Arrays with first axis corresponding to the selected increments:
+            'count', 'mean', 'std', 'min', 'max', and, if requested,
+            'percentiles', 'histogram', and 'bin_edges'. If grouped, a
+            dictionary of such dictionaries with constituent/materialpoint
+            names as keys.
 
+        Examples
+        --------
+        Von Mises equivalent Cauchy stress (mean, standard deviation, and median) of each phase.
 
-    def list_data(self):
-        """Return information on all active datasets in the file."""
-        message = ''
-        with h5py.File(self.fname,'r') as f:
-            for i in self.iterate('increments'):
-                message += f'\n{i} ({self.times[self.increments.index(i)]}s)\n'
-                for o,p in zip(['constituents','materialpoints'],['con_physics','mat_physics']):
-                    message += f'  {o[:-1]}\n'
-                    for oo in self.iterate(o):
-                        message += f'    {oo}\n'
-                        for pp in self.iterate(p):
-                            message += f'      {pp}\n'
-                            group = '/'.join([i,o[:-1],oo,pp])                                      # o[:-1]: plural/singular issue
-                            for d in f[group].keys():
-                                try:
-                                    dataset = f['/'.join([group,d])]
-                                    if 'Unit' in dataset.attrs:
-                                        unit = f" / {dataset.attrs['Unit']}" if h5py3 else \
-                                               f" / {dataset.attrs['Unit'].decode()}"
-                                    else:
-                                        unit = ''
-                                    description = dataset.attrs['Description'] if h5py3 else \
-                                                  dataset.attrs['Description'].decode()
-                                    message += f'        {d}{unit}: {description}\n'
-                                except KeyError:
-                                    pass
-        return message
+        >>> s = r.statistics('sigma_vM',percentiles=[50],grouped=True)
+        >>> s['1_pheno_fcc']['mean'], s['1_pheno_fcc']['std'], s['1_pheno_fcc']['percentiles'][:,0]
 
+        """
+        index = self._get_index()
+        increments = self.selection['increments']
+        locations = {}
+        for i in increments:
+            if label in index.get(f'{i}/geometry',{}) and not grouped:
+                locations.setdefault(None,{}).setdefault(i,[]).append(f'{i}/geometry/{label}')
+            for g in self._selected_groups([i]):
+                if label in index[g]:
+                    locations.setdefault(g.split('/')[2] if grouped else None,{}).setdefault(i,[]) \
+                             .append(f'{g}/{label}')
+        if not locations:
+            raise ValueError(f'dataset "{label}" not found')
+
+        statistics = {}
+        with self._read() as f:
+            for name,paths in locations.items():
+                first = f[next(iter(paths.values()))[0]]
+                shape = first.shape[1:] + (() if first.dtype.names is None else (len(first.dtype.names),))
+                N_components = int(np.prod(shape))
+                s = {'count': np.zeros(len(increments),np.int64),
+                     'mean':  np.full((len(increments),N_components),np.nan),
+                     'std':   np.full((len(increments),N_components),np.nan),
+                     'min':   np.full((len(increments),N_components),np.nan),
+                     'max':   np.full((len(increments),N_components),np.nan)}
+                N_bins = {'histogram':bins, 'percentiles':4096 if percentiles else None}
+                for k in ['histogram','percentiles']:
+                    if N_bins[k] is not None: s[k] = np.zeros((len(increments),N_bins[k],N_components))
+                if bins is not None: s['bin_edges'] = np.full((len(increments),bins+1,N_components),np.nan)
+
+                def count(j,k,b,e):
+                    width = np.where(e[-1]>e[0],e[-1]-e[0],1.0)
+                    idx = np.floor((b-e[0])/width*N_bins[k]).astype(np.int64)
+                    idx[b==e[-1]] = N_bins[k]-1                                                     # right edge belongs to last bin
+                    valid = (idx>=0) & (idx<N_bins[k])
+                    s[k][j] += np.bincount((idx+N_bins[k]*np.arange(N_components))[valid],
+                                           minlength=N_bins[k]*N_components) \
+                                 .reshape(N_components,N_bins[k]).T
+
+                for j,i in enumerate(increments):
+                    blocks = lambda: (rfn.structured_to_unstructured(b) if b.dtype.names is not None else b
+                                      for p in paths.get(i,[]) for r in range(0,f[p].shape[0],block_size)
+                                      for b in [f[p][r:r+block_size]])
+
+                    edges = {}                                                                      # known in advance
+                    if bins is not None and value_range is not None:
+                        edges['histogram'] = np.linspace(np.full(N_components,value_range[0],float),
+                                                         np.full(N_components,value_range[1],float),bins+1)
+
+                    n,mean,M2 = 0,np.zeros(N_components),np.zeros(N_components)
+                    for b in blocks():
+                        b = b.reshape(len(b),N_components).astype(np.float64)
+                        if len(b) == 0: continue
+                        b_mean = np.mean(b,axis=0)
+                        delta  = b_mean - mean
+                        mean   = mean + delta*len(b)/(n+len(b))
+                        M2     = M2 + np.sum((b-b_mean)**2,axis=0) + delta**2*n*len(b)/(n+len(b))
+                        s['min'][j] = np.fmin(s['min'][j],np.min(b,axis=0))
+                        s['max'][j] = np.fmax(s['max'][j],np.max(b,axis=0))
+                        for k,e in edges.items(): count(j,k,b,e)
+                        n += len(b)
+                    s['count'][j] = n
+                    if n == 0:
+                        if percentiles: s['percentiles'][j] = np.nan
+                        continue
+                    s['mean'][j],s['std'][j] = mean,np.sqrt(M2/n)
+
+                    second = {k:np.linspace(s['min'][j],s['max'][j],N_bins[k]+1)                    # depend on min/max
+                              for k in ['histogram','percentiles'] if N_bins[k] is not None and k not in edges}
+                    for b in blocks() if second else []:
+                        b = b.reshape(len(b),N_components)
+                        for k,e in second.items(): count(j,k,b,e)
+                    edges.update(second)
+                    if bins is not None: s['bin_edges'][j] = edges['histogram']
+
+                    if percentiles:
+                        cdf = np.concatenate((np.zeros((1,N_components)),np.cumsum(s['percentiles'][j],axis=0)))
+                        s['percentiles'][j,:len(percentiles)] = np.array([[np.interp(q/100*n,cdf[:,c],edges['percentiles'][:,c])
+                                                                           for c in range(N_components)]
+                                                                          for q in percentiles])
+                if percentiles: s['percentiles'] = s['percentiles'][:,:len(percentiles)]
+                statistics[name] = {k:v.reshape(v.shape[:-1]+shape) if k != 'count' else v for k,v in s.items()}
+
+        return statistics if grouped else statistics[None]
+
+
+    def aggregate(self,label,IDs,reductions=['mean'],c=0,block_size=65536):
+        """
+        Aggregate a dataset per grain for each selected increment.
 
-    def get_dataset_location(self,label):
-        """Return the location of all active datasets with given label."""
-        path = []
-        with h5py.File(self.fname,'r') as f:
-            for i in self.iterate('increments'):
-                k = '/'.join([i,'geometry',label])
-                try:
-                    f[k]
-                    path.append(k)
-                except KeyError:
-                    pass
-                for o,p in zip(['constituents','materialpoints'],['con_physics','mat_physics']):
-                    for oo in self.iterate(o):
-                        for pp in self.iterate(p):
-                            k = '/'.join([i,o[:-1],oo,pp,label])
-                            try:
-                                f[k]
-                                path.append(k)
-                            except KeyError:
-                                pass
-        return path
+        Cells are grouped by the given grain IDs and all reductions are computed
+        with vectorized, grouped kernels (numpy.bincount) from blocks of rows, i.e.
+        the cost does not depend on the number of grains. Cells without data,
+        e.g. of phases that do not have the dataset, are not considered.
 
+        Parameters
+        ----------
+        label : str
+            Label of the dataset.
+        IDs : numpy.ndarray of int or str
+            Grain ID of each cell, e.g. 'damask.Geom.material.flatten(order='F')',
+            or label of a dataset containing the grain IDs (values of the first selected
+            increment are used).
+        reductions : str or list of str, optional
+            Reductions to compute, out of 'count', 'sum', 'mean', 'min', and 'max'.
+            For orientations, only 'count' and 'mean' are available, the latter
+            being the average orientation as in damask.Orientation.average.
+            Defaults to 'mean'.
+        c : int, optional
+            Constituent to consider. Defaults to 0.
+        block_size : int, optional
+            Number of rows read at once. Defaults to 65536.
+
+        Returns
+        -------
+        aggregates : dict
+            Grain IDs ('ID') and results of the reductions, their first axis
+            corresponds to the selected increments and the second one to the grains.
+            Orientations are given as quaternions.
 
-    def get_constituent_ID(self,c=0):
-        """Pointwise constituent ID."""
-        with h5py.File(self.fname,'r') as f:
-            names = f['/mapping/cellResults/constituent']['Name'][:,c].astype('str')
-        return np.array([int(n.split('_')[0]) for n in names.tolist()],dtype=np.int32)
+        Examples
+        --------
+        Average Cauchy stress and orientation of each grain.
 
+        >>> g = damask.Geom.load('my_geometry.vtr')
+        >>> r.aggregate('sigma',g.material.flatten(order='F'))['mean']
+        >>> damask.Orientation(r.aggregate('O',g.material.flatten(order='F'))['mean'][-1],lattice='cF')
 
-    def get_crystal_structure(self):                                                                # ToDo: extension to multi constituents/phase
-        """Info about the crystal structure."""
-        with h5py.File(self.fname,'r') as f:
-            return f[self.get_dataset_location('O')[0]].attrs['Lattice'] if h5py3 else \
-                   f[self.get_dataset_location('O')[0]].attrs['Lattice'].decode()
+        """
+        reductions = reductions if isinstance(reductions,list) else [reductions]
+        if not set(reductions) <= {'count','sum','mean','min','max'}:
+            raise ValueError(f'invalid reduction(s) {set(reductions)-{"count","sum","mean","min","max"}}')
+        if isinstance(IDs,str):
+            IDs = self.read_dataset([l for l in self.get_dataset_location(IDs)
+                                     if l.startswith(self.selection['increments'][0]+'/')],c)
+        grains,grain = np.unique(np.asarray(IDs).reshape(-1),return_inverse=True)
+
+        index = self._get_index()
+        increments = self.selection['increments']
+        locations = {i:[f'{g}/{label}' for g in self._selected_groups([i]) if label in index[g]] for i in increments}
+        if not any(locations.values()):
+            raise ValueError(f'dataset "{label}" not found')
+
+        def grouped_sum(g,data):
+            return np.stack([np.bincount(g,data[:,k],len(grains)) for k in range(data.shape[1])],axis=-1)
+
+        def grouped_extremum(g,data,ufunc):
+            order = np.argsort(g,kind='stable')
+            start = np.flatnonzero(np.concatenate(([True],g[order][1:] != g[order][:-1])))
+            return g[order][start],ufunc.reduceat(data[order],start,axis=0)
+
+        aggregates = {'ID':grains}
+        with self._read() as f:
+            for j,i in enumerate(increments):
+                count = np.zeros(len(grains),np.int64)
+                total = reference = None
+                for path in locations[i]:
+                    kind,name = path.split('/')[1:3]
+                    dataset = f[path]
+                    orientation = dataset.dtype.names is not None
+                    if orientation and not set(reductions) <= {'count','mean'}:
+                        raise ValueError('only "count" and "mean" are available for orientations')
+                    cells,positions = self._get_mapping(kind,name,c)
+                    row_to_cell = np.full(dataset.shape[0],-1,np.int64)
+                    row_to_cell[positions] = cells
+
+                    for r in range(0,dataset.shape[0],block_size):
+                        cell = row_to_cell[r:r+block_size]
+                        data = dataset[r:r+block_size][cell >= 0]
+                        g = grain[cell[cell >= 0]]
+                        if orientation:
+                            q = rfn.structured_to_unstructured(data)
+                            if reference is None: reference = np.full((len(grains),4),np.nan)
+                            new = np.isnan(reference[g,0])
+                            first = np.unique(g[new],return_index=True)
+                            reference[first[0]] = q[new][first[1]]
+                            lattice = dataset.attrs['Lattice'] if h5py3 else dataset.attrs['Lattice'].decode()
+                            eq = Orientation(rotation=q,lattice={'fcc':'cF','bcc':'cI','hex':'hP'}.get(lattice,lattice))\
+                                 .equivalent.quaternion
+                            q = np.take_along_axis(eq,np.argmax(np.abs(np.einsum('snj,nj->sn',eq,reference[g])),
+                                                                axis=0)[np.newaxis,:,np.newaxis],axis=0)[0]
+                            data = np.einsum('ni,nj->nij',q,q)                                      # averaging according to Markley et al.
+                        data = data.reshape(len(data),-1)
+                        if data.dtype.kind == 'f':
+                            valid = ~np.all(np.isnan(data),axis=1)
+                            data,g = data[valid],g[valid]
+                        if total is None:
+                            shape = (4,) if orientation else dataset.shape[1:]
+                            total = np.zeros((len(grains),data.shape[1]))
+                            minimum = np.full((len(grains),data.shape[1]),np.nan)
+                            maximum = np.full((len(grains),data.shape[1]),np.nan)
+                        count += np.bincount(g,minlength=len(grains))
+                        total += grouped_sum(g,data)
+                        if 'min' in reductions and len(g) > 0:
+                            idx,m = grouped_extremum(g,data,np.minimum)
+                            minimum[idx] = np.fmin(minimum[idx],m)
+                        if 'max' in reductions and len(g) > 0:
+                            idx,m = grouped_extremum(g,data,np.maximum)
+                            maximum[idx] = np.fmax(maximum[idx],m)
+
+                if total is None: continue
+                with np.errstate(invalid='ignore',divide='ignore'):
+                    results = {'count': count,
+                               'sum':   total,
+                               'mean':  total/count[:,np.newaxis],
+                               'min':   minimum,
+                               'max':   maximum}
+                if reference is not None:
+                    results['mean'] = np.linalg.eigh(np.nan_to_num(results['mean']).reshape(-1,4,4))[1][...,-1]
+                    results['mean'] *= np.where(results['mean'][:,0:1]<0,-1,1)
+                    results['mean'][count==0] = np.nan
+                for k in reductions:
+                    if k not in aggregates:
+                        aggregates[k] = np.full((len(increments),len(grains))+(() if k == 'count' else shape),
+                                                0 if k == 'count' else np.nan)
+                    aggregates[k][j] = results[k] if k == 'count' else results[k].reshape((len(grains),)+shape)
+
+        return aggregates
+
+
+    def region(self,box=None,slab=None,plane=None,mask=None):
+        """
+        Determine cells and nodes of a region of interest of a grid.
 
+        Exactly one of 'box', 'slab', 'plane', or 'mask' needs to be given.
+        The returned cells can be used in read_dataset to read only the
+        data of the region.
 
-    def enable_user_function(self,func):
-        globals()[func.__name__]=func
-        print(f'Function {func.__name__} enabled in add_calculation.')
+        Parameters
+        ----------
+        box : sequence of two sequences of 3 int
+            Lower (inclusive) and upper (exclusive) grid indices of a box of cells.
+        slab : sequence of 3 int
+            Axis (0, 1, or 2), lower (inclusive) and upper (exclusive) grid
+            index along it of a slab of cells.
+        plane : sequence of 2 int
+            Axis (0, 1, or 2) and grid index along it of a plane of cells.
+        mask : numpy.ndarray of bool, shape (grid)
+            Cells of the region.
+
+        Returns
+        -------
+        region : dict
+            Indices of the cells ('cells') and nodes ('nodes'), their coordinates
+            ('cell_coordinates' and 'node_coordinates'), and number of cells along each
+            direction ('grid', None for mask). Cells and nodes of boxes, slabs, and planes
+            are ordered with x running fastest.
 
+        Examples
+        --------
+        Stress in the central xy-plane of a grid.
 
-    def read_dataset(self,path,c=0,plain=False):
-        """
-        Dataset for all points/cells.
+        >>> roi = r.region(plane=(2,r.grid[2]//2))
+        >>> P = r.read_dataset(r.get_dataset_location('P'),cells=roi['cells'])
+        >>> P.reshape(tuple(roi['grid'])+(3,3),order='F')
 
-        If more than one path is given, the dataset is composed of the individual contributions.
         """
-        with h5py.File(self.fname,'r') as f:
-            shape = (self.Nmaterialpoints,) + np.shape(f[path[0]])[1:]
-            if len(shape) == 1: shape = shape +(1,)
-            dataset = np.full(shape,np.nan,dtype=np.dtype(f[path[0]]))
-            for pa in path:
-                label = pa.split('/')[2]
-
-                if pa.split('/')[1] == 'geometry':
-                    dataset = np.array(f[pa])
-                    continue
-
-                p = np.where(f['mapping/cellResults/constituent'][:,c]['Name'] == str.encode(label))[0]
-                if len(p)>0:
-                    u = (f['mapping/cellResults/constituent']['Position'][p,c])
-                    a = np.array(f[pa])
-                    if len(a.shape) == 1:
-                        a=a.reshape([a.shape[0],1])
-                    dataset[p,:] = a[u,:]
-
-                p = np.where(f['mapping/cellResults/materialpoint']['Name'] == str.encode(label))[0]
-                if len(p)>0:
-                    u = (f['mapping/cellResults/materialpoint']['Position'][p.tolist()])
-                    a = np.array(f[pa])
-                    if len(a.shape) == 1:
-                        a=a.reshape([a.shape[0],1])
-                    dataset[p,:] = a[u,:]
-
-        if plain and dataset.dtype.names is not None:
-            return dataset.view(('float64',len(dataset.dtype.names)))
+        if not self.structured:
+            raise NotImplementedError('regions of interest only available for grid results')
+        if sum(x is not None for x in [box,slab,plane,mask]) != 1:
+            raise ValueError('specify exactly one of box, slab, plane, or mask')
+
+        if plane is not None:
+            slab = (plane[0],plane[1],plane[1]+1)
+        if slab is not None:
+            box = (np.zeros(3,dtype=int),self.grid.copy())
+            box[0][slab[0]],box[1][slab[0]] = slab[1],slab[2]
+
+        if box is not None:
+            lower,upper = np.clip(box[0],0,self.grid),np.clip(box[1],0,self.grid)
+            if np.any(upper <= lower):
+                raise ValueError(f'empty box {lower}--{upper}')
+            ijk   = np.array(np.meshgrid(*[np.arange(l,u)   for l,u in zip(lower,upper)],indexing='ij')) \
+                      .reshape(3,-1,order='F')
+            ijk_n = np.array(np.meshgrid(*[np.arange(l,u+1) for l,u in zip(lower,upper)],indexing='ij')) \
+                      .reshape(3,-1,order='F')
+            grid = upper-lower
         else:
-            return dataset
+            if np.shape(mask) != tuple(self.grid):
+                raise ValueError(f'mask shape {np.shape(mask)} does not match grid {self.grid}')
+            ijk   = np.array(np.unravel_index(np.flatnonzero(np.ravel(mask,order='F')),self.grid,order='F'))
+            corners = np.array([[0,0,0],[1,0,0],[0,1,0],[1,1,0],[0,0,1],[1,0,1],[0,1,1],[1,1,1]])
+            ijk_n = np.array(np.unravel_index(np.unique(np.ravel_multi_index(
+                                                        (ijk[:,:,np.newaxis]+corners.T[:,np.newaxis,:]).reshape(3,-1),
+                                                        self.grid+1,order='F')),
+                                              self.grid+1,order='F'))
+            grid = None
+
+        return {'cells':            np.ravel_multi_index(ijk,  self.grid,  order='F'),
+                'nodes':            np.ravel_multi_index(ijk_n,self.grid+1,order='F'),
+                'cell_coordinates': self.origin + (ijk.T+.5)*self.size/self.grid,
+                'node_coordinates': self.origin +  ijk_n.T  *self.size/self.grid,
+                'grid':             grid}
+
+
+    def _cells_at(self,coordinates):
+        """Return indices of the cells containing the given points or having the nearest center."""
+        if self.structured:
+            ijk = np.clip(np.floor((coordinates-self.origin)/self.size*self.grid).astype(np.int64),
+                          0,self.grid-1)
+            return ijk[:,0] + self.grid[0]*(ijk[:,1] + self.grid[1]*ijk[:,2])
+        else:
+            return spatial.cKDTree(self.cell_coordinates).query(coordinates)[1]
+
 
     @property
     def cell_coordinates(self):
@@ -522,7 +1845,7 @@ class Result:
         if self.structured:
             return grid_filters.cell_coord0(self.grid,self.size,self.origin).reshape(-1,3,order='F')
         else:
-            with h5py.File(self.fname,'r') as f:
+            with self._read() as f:
                 return f['geometry/x_c'][()]
 
     @property
@@ -531,10 +1854,122 @@ class Result:
         if self.structured:
             return grid_filters.node_coord0(self.grid,self.size,self.origin).reshape(-1,3,order='F')
         else:
-            with h5py.File(self.fname,'r') as f:
+            with self._read() as f:
                 return f['geometry/x_n'][()]
 
 
+    def _displacement_operator(self):
+        """Return the wave vector operator that integrates F to the cell displacement fluctuation."""
+        if self._operator is None:
+            k_s = grid_filters._ks(self.size,self.grid,False)
+            k_s_squared = np.einsum('...l,...l',k_s,k_s)
+            k_s_squared[0,0,0] = 1.0
+            self._operator = -k_s*(0.5j*self.size/np.pi)/k_s_squared[...,np.newaxis]
+        return self._operator
+
+
+    def deformed_coordinates(self,mode='cell',F='F',persist=False,batch_size=8):
+        """
+        Deformed coordinates of the cell centers or nodes for the selected increments.
+
+        The displacements are integrated from the deformation gradient in
+        Fourier space (see grid_filters.cell_coord and grid_filters.node_coord)
+        for several increments at once. The displacement fields are only kept
+        for repeated calls if caching is enabled (see enable_cache), within its
+        budget and with hits and misses counted in cache_info. Otherwise, they
+        are recalculated on every call.
+        Results can be stored in the DADF5 file as 'x_p' (cells) or 'x_n' (nodes)
+        in the geometry group of each increment, from where they are read if up to date.
+
+        Parameters
+        ----------
+        mode : {'cell', 'point'}, optional
+            Calculate coordinates of cell centers or nodes. Defaults to 'cell'.
+        F : str, optional
+            Label of the deformation gradient. Defaults to 'F'.
+        persist : bool, optional
+            Store the coordinates in the DADF5 file. Defaults to False.
+        batch_size : int, optional
+            Number of increments that are transformed together. Defaults to 8.
+
+        Returns
+        -------
+        x : numpy.ndarray of shape (N_increments,N_cells,3) or (N_increments,N_nodes,3)
+            Deformed coordinates.
+
+        """
+        if not self.structured:
+            raise NotImplementedError('deformed coordinates are only available for grid results')
+        if mode.lower() not in ['cell','point']:
+            raise ValueError(f'invalid mode "{mode}"')
+
+        label  = 'x_p' if mode.lower() == 'cell' else 'x_n'
+        index  = self._get_index()
+        recipe = self._recipe(Result.deformed_coordinates,{'F':F},{'mode':mode.lower()})
+        locations = self.get_dataset_location(F)
+        paths = {i:[l for l in locations if l.split('/')[0] == i] for i in self.selection['increments']}
+        if not all(paths.values()):
+            raise ValueError(f'dataset "{F}" not found in all selected increments')
+        fingerprints = {i:self._fingerprint(recipe,[index[os.path.dirname(p)][F] for p in paths[i]]) for i in paths}
+
+        x = {}
+        with self._read() as f:
+            for i in paths:
+                info = index[f'{i}/geometry'].get(label)
+                if info is not None and info['fingerprint'] == fingerprints[i]:
+                    x[i] = f[f'{i}/geometry/{label}'][()]
+        stored = list(x)
+
+        def coordinates(F_avg,u):
+            if mode.lower() == 'cell':
+                x0 = grid_filters.cell_coord0(self.grid,self.size)
+                x_ = grid_filters.cell_coord0(self.grid,self.size,self.origin) + u
+            else:
+                x0 = grid_filters.node_coord0(self.grid,self.size)
+                x_ = grid_filters.node_coord0(self.grid,self.size,self.origin) + grid_filters.cell_2_node(u)
+            return (x_ + np.einsum('ml,ijkl->ijkm',F_avg-np.eye(3),x0)).reshape(-1,3,order='F')
+
+        for i in paths:
+            if i in x or self._cache is None:
+                continue
+            if ('u',i,F) in self._cache['data']:
+                self._cache['hits'] += 1
+                self._cache['data'].move_to_end(('u',i,F))
+                x[i] = coordinates(self._deformed[(i,F)],self._cache['data'][('u',i,F)])
+            else:
+                self._cache['misses'] += 1
+
+        todo = [i for i in paths if i not in x]
+        for b in range(0,len(todo),batch_size):
+            F_ = np.stack([self.read_dataset(paths[i]) for i in todo[b:b+batch_size]])
+            F_ = F_.reshape((len(F_),)+tuple(self.grid[::-1])+(3,3)).transpose(0,3,2,1,4,5)          # x fast
+            u_fluct = np.fft.irfftn(np.einsum('nijkml,ijkl->nijkm',np.fft.rfftn(F_,axes=(1,2,3)),
+                                              self._displacement_operator()),
+                                    axes=(1,2,3),s=tuple(self.grid))
+            for i,F_avg,u in zip(todo[b:b+batch_size],np.average(F_,axis=(1,2,3)),u_fluct):
+                x[i] = coordinates(F_avg,u)
+                if self._cache is not None and u.nbytes <= self._cache['budget']:
+                    self._deformed[(i,F)] = F_avg                                                   # displacement is in the cache
+                    self._cache['data'][('u',i,F)] = u
+                    self._cache['size'] += u.nbytes
+                    self._evict()
+
+        if persist:
+            self._persist_coordinates(label,mode.lower(),F,{i:x[i] for i in paths if i not in stored},fingerprints)
+        return np.stack([x[i] for i in paths])
+
+
+    def _persist_coordinates(self,label,mode,F,x,fingerprints):
+        """Store deformed coordinates in the geometry group of the increments."""
+        meta = {'Unit':        'm',
+                'Description': f'Deformed coordinates of the {"cell centers" if mode == "cell" else "nodes"} '
+                               f'calculated from {F}',
+                'Creator':     'deformed_coordinates'}
+        with self._write() as f:
+            for i,data in x.items():
+                self._write_dataset(f,f'{i}/geometry',label,data,meta,fingerprints[i])
+
+
     @staticmethod
     def _add_absolute(x):
         return {
@@ -561,12 +1996,10 @@ class Result:
 
     @staticmethod
     def _add_calculation(**kwargs):
-        formula = kwargs['formula']
-        for d in re.findall(r'#(.*?)#',formula):
-            formula = formula.replace(f'#{d}#',f"kwargs['{d}']['data']")
-
         return {
-                'data':  eval(formula),
+                'data':  _evaluate_formula(kwargs['formula'],
+                                           {d:kwargs[d]['data'] for d in re.findall(r'#(.*?)#',kwargs['formula'])},
+                                           _user_functions(kwargs['functions'])),
                 'label': kwargs['label'],
                 'meta':  {
                           'Unit':        kwargs['unit'],
@@ -584,14 +2017,18 @@ class Result:
           Label of resulting dataset.
         formula : str
             Formula to calculate resulting dataset. Existing datasets are referenced by ‘#TheirLabel#‘.
+            Arithmetic operations, indexing, common NumPy functions (e.g. ‘np.abs‘), and functions
+            enabled with enable_user_function are permitted.
         unit : str, optional
             Physical unit of the result.
         description : str, optional
             Human-readable description of the result.
 
         """
+        _compile_formula(formula,tuple(sorted(self._user_functions)))                               # validate before starting calculation
         dataset_mapping  = {d:d for d in set(re.findall(r'#(.*?)#',formula))}                       # datasets used in the formula
-        args             = {'formula':formula,'label':label,'unit':unit,'description':description}
+        args             = {'formula':formula,'label':label,'unit':unit,'description':description,
+                            'functions':dict(self._user_functions)}
         self._add_generic_pointwise(self._add_calculation,dataset_mapping,args)
 
 
@@ -1048,23 +2485,238 @@ class Result:
         self._add_generic_pointwise(self._add_stretch_tensor,{'F':F},{'t':t})
 
 
-    def _job(self,group,func,datasets,args,lock):
-        """Execute job for _add_generic_pointwise."""
+    def _get_pool(self):
+        """Return the pool of worker processes, start it on first access."""
+        if self._pool is None:
+            num_threads = damask.environment.options['DAMASK_NUM_THREADS']
+            self._N_workers = int(num_threads) if num_threads is not None else mp.cpu_count()
+            resource_tracker.ensure_running()                                                       # workers share the tracker of shared memory
+            with self._suspend():                                                                   # forked workers must not inherit the handle
+                self._pool = mp.Pool(self._N_workers)
+        return self._pool
+
+
+    def _close_pool(self):
+        """Stop the pool of worker processes."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+
+    def _read_shared(self,f,group,labels,rows):
+        """Read a block of rows of datasets of a group into shared memory."""
+        shared = {}
         try:
-            datasets_in = {}
-            lock.acquire()
-            with h5py.File(self.fname,'r') as f:
-                for arg,label in datasets.items():
-                    loc  = f[group+'/'+label]
-                    datasets_in[arg]={'data' :loc[()],
-                                      'label':label,
-                                      'meta': {k:(v if h5py3 else v.decode()) for k,v in loc.attrs.items()}}
-            lock.release()
-            r = func(**datasets_in,**args)
-            return [group,r]
-        except Exception as err:
-            print(f'Error during calculation: {err}.')
-            return None
+            for label in labels:
+                loc = f[group+'/'+label]
+                shape = (len(range(loc.shape[0])[rows]),)+loc.shape[1:]
+                shm = shared_memory.SharedMemory(create=True,size=max(loc.dtype.itemsize*int(np.prod(shape)),1))
+                shared[label] = {'name':  shm.name,
+                                 'shape': shape,
+                                 'dtype': loc.dtype,
+                                 'meta':  {k:(v if h5py3 else v.decode()) for k,v in loc.attrs.items()}}
+                try:
+                    if shape[0] > 0: loc.read_direct(np.ndarray(shape,loc.dtype,buffer=shm.buf),np.s_[rows])
+                finally:
+                    shm.close()
+        except BaseException:
+            _unlink_shared(shared.values())
+            raise
+        return shared
+
+
+    def _write_shared(self,dataset,rows,result):
+        """Write a block of rows of the result of a pointwise calculation from shared memory to the file."""
+        shm = shared_memory.SharedMemory(name=result['name'])
+        try:
+            data = np.ndarray(result['shape'],result['dtype'],buffer=shm.buf)
+            if data.shape[0] > 0: dataset[rows] = data
+        finally:
+            data = None                                                                             # release view on shared memory
+            shm.close()
+            shm.unlink()
+
+
+    def _write_dataset(self,f,group,label,data,meta,fingerprint):
+        """
+        Write a derived dataset with its metadata and fingerprint to the file.
+
+        Parameters
+        ----------
+        f : h5py.File
+            DADF5 file opened for modification.
+        group : str
+            Group of the dataset.
+        label : str
+            Label of the dataset.
+        data : numpy.ndarray
+            Data of the dataset.
+        meta : dict
+            Attributes of the dataset, the 'Creator' is given without package and version.
+        fingerprint : str
+            Fingerprint of the dataset, see _fingerprint.
+
+        """
+        try:
+            dataset = self._create_dataset(f,group,label,data.shape,data.dtype,fingerprint.split(':')[0])
+            dataset[...] = data
+            self._finalize_dataset(dataset,group,label,meta,fingerprint)
+        except (OSError,RuntimeError,TypeError,ValueError) as err:
+            print(f'Could not add dataset: {err}.')
+
+
+    def _create_dataset(self,f,group,label,shape,dtype,recipe):
+        """
+        Create a derived dataset without data and metadata, see _write_dataset.
+
+        An existing dataset is overwritten if modification is allowed or
+        if it is an outdated result of the same recipe.
+        """
+        existing = self._get_index()[group].get(label)
+        if existing is not None and \
+           (self._allow_modification or (existing['fingerprint'] or '').split(':')[0] == recipe):     # outdated result of same recipe
+            if existing['shape'] != shape: del f[group+'/'+label]
+            dataset = f.require_dataset(group+'/'+label,shape=shape,**self._storage_options(shape,dtype))
+            dataset.attrs['Overwritten'] = 'Yes' if h5py3 else \
+                                           'Yes'.encode()
+            return dataset
+        return f[group].create_dataset(label,shape=shape,**self._storage_options(shape,dtype))
+
+
+    def _finalize_dataset(self,dataset,group,label,meta,fingerprint):
+        """Store metadata and fingerprint of a derived dataset and add it to the index, see _write_dataset."""
+        now = datetime.datetime.now().astimezone()
+        dataset.attrs['Created'] = now.strftime('%Y-%m-%d %H:%M:%S%z') if h5py3 else \
+                                   now.strftime('%Y-%m-%d %H:%M:%S%z').encode()
+        dataset.attrs['Fingerprint'] = fingerprint if h5py3 else \
+                                       fingerprint.encode()
+
+        for l,v in meta.items():
+            dataset.attrs[l]=v if h5py3 else v.encode()
+        creator = dataset.attrs['Creator'] if h5py3 else \
+                  dataset.attrs['Creator'].decode()
+        dataset.attrs['Creator'] = f"damask.Result.{creator} v{damask.version}" if h5py3 else \
+                                   f"damask.Result.{creator} v{damask.version}".encode()
+
+        self._get_index()[group][label] = self._dataset_info(dataset)
+
+
+    def add_multiple(self,quantities):
+        """
+        Add several derived quantities in a single pass.
+
+        The input datasets of each group are read only once, block by block,
+        and quantities calculated from other quantities use the results held
+        in memory. All results of a block are written together.
+
+        Parameters
+        ----------
+        quantities : list of tuple
+            Quantities to add, given as name of the respective add_* function
+            (without 'add_') and dictionary of its arguments. A quantity can
+            depend on quantities listed before it.
+
+        Examples
+        --------
+        Add Cauchy stress, its von Mises equivalent, the logarithmic strain,
+        and its von Mises equivalent.
+
+        >>> r.add_multiple([('Cauchy',{}),
+        ...                 ('Mises',{'T_sym':'sigma'}),
+        ...                 ('strain_tensor',{'F':'F','t':'V','m':0.0}),
+        ...                 ('Mises',{'T_sym':'epsilon_V^0.0(F)'})])
+
+        """
+        self._add_pointwise(self._record_jobs(quantities))
+
+
+    def _record_jobs(self,quantities):
+        """
+        Return the callback functions of add_* functions without evaluating them.
+
+        Parameters
+        ----------
+        quantities : list of tuple
+            Name of the add_* function (without 'add_') and dictionary of its arguments.
+
+        """
+        if not isinstance(quantities,list) or \
+           not all(isinstance(q,tuple) and len(q) == 2 and isinstance(q[1],dict) for q in quantities):
+            raise TypeError('quantities need to be given as list of (name,arguments) tuples')
+        self._jobs = []
+        try:
+            for name,kwargs in quantities:
+                getattr(self,f'add_{name}')(**kwargs)
+            return self._jobs
+        finally:
+            self._jobs = None
+
+
+    def evaluate(self,quantities,c=0,block_size=65536):
+        """
+        Calculate derived quantities without writing them to the DADF5 file.
+
+        The same calculations as for the add_* functions are done for the
+        selected increments and groups in blocks of rows of the input datasets.
+        The DADF5 file is only read, i.e. read-only files are supported.
+        Results are returned increment by increment, i.e. only the data of
+        one increment is held in memory at a time.
+
+        Parameters
+        ----------
+        quantities : list of tuple
+            Quantities to calculate, given as name of the respective add_* function
+            (without 'add_') and dictionary of its arguments. A quantity can
+            depend on quantities listed before it.
+        c : int, optional
+            Constituent to consider. Defaults to 0.
+        block_size : int, optional
+            Number of rows of the input datasets processed at once. Defaults to 65536.
+
+        Yields
+        ------
+        increment : str
+            Name of the selected increment.
+        data : dict of numpy.ndarray of shape (N_cells,...)
+            Calculated quantities of the increment, keyed by label. NaN where not defined.
+
+        Examples
+        --------
+        Calculate the volume average of the von Mises equivalent of the Cauchy stress.
+
+        >>> for inc,d in r.evaluate([('Cauchy',{}),('Mises',{'T_sym':'sigma'})]):
+        ...     print(inc,np.nanmean(d['sigma_vM']))
+
+        """
+        jobs = self._record_jobs(quantities)
+        return self._evaluate(jobs,c,block_size)
+
+
+    def _evaluate(self,jobs,c,block_size):
+        """Calculate the results of pointwise callback functions increment by increment, see evaluate."""
+        index = self._get_index()
+        inputs = set([label for _,datasets,_ in jobs for label in datasets.values()])
+        for inc in util.show_progress(self.selection['increments']):
+            data = {}
+            with self._read() as f:
+                for group in self._selected_groups([inc]):
+                    labels = [l for l in index[group] if l in inputs]
+                    if not labels: continue
+                    meta = {l:{k:(v if h5py3 else v.decode()) for k,v in f[group][l].attrs.items()} for l in labels}
+                    p,u = self._get_mapping(*group.split('/')[1:3],c)
+                    order = np.argsort(u,kind='stable')
+                    N = index[group][labels[0]]['shape'][0]
+                    for b in range(0,N,block_size):
+                        s,e = np.searchsorted(u[order],[b,b+block_size])
+                        available = {l:{'data':f[group][l][b:b+block_size],'label':l,'meta':meta[l]} for l in labels}
+                        for r in _evaluate_jobs(jobs,available):
+                            x = r['data'].reshape((len(r['data']),)+(r['data'].shape[1:] or (1,)))         # as read_dataset
+                            if r['label'] not in data:
+                                data[r['label']] = np.full((self.Nmaterialpoints,)+x.shape[1:],np.nan,
+                                                           x.dtype if x.dtype.kind in 'fc' else float)
+                            data[r['label']][p[order[s:e]]] = x[u[order[s:e]]-b]
+            yield inc,data
 
 
     def _add_generic_pointwise(self,func,datasets,args={}):
@@ -1083,150 +2735,581 @@ class Result:
             Arguments parsed to func.
 
         """
-        num_threads = damask.environment.options['DAMASK_NUM_THREADS']
-        pool = mp.Pool(int(num_threads) if num_threads is not None else None)
-        lock = mp.Manager().Lock()
+        if self._jobs is not None:
+            self._jobs.append((func,datasets,args))
+        else:
+            self._add_pointwise([(func,datasets,args)])
+
+
+    def _add_pointwise(self,jobs):
+        """
+        Calculate and store the results of pointwise callback functions.
 
-        groups = self.groups_with_datasets(datasets.values())
+        The parent process reads blocks of rows of the input datasets group
+        by group into shared memory, a pool of worker processes (kept alive
+        during a session, see __enter__) evaluates the callback functions, and the parent process writes the
+        results from shared memory to the file, which is kept open for the
+        whole operation. Formulas of add_calculation that are not pointwise
+        are evaluated for complete groups.
+
+        Parameters
+        ----------
+        jobs : list of tuple
+            Callback function, mapping of arguments to dataset labels, and further arguments,
+            see _add_generic_pointwise.
+
+        """
+        groups = list(dict.fromkeys([g for _,datasets,_ in jobs for g in self.groups_with_datasets(datasets.values())]))
         if len(groups) == 0:
             print('No matching dataset found, no data was added.')
             return
 
-        default_arg = partial(self._job,func=func,datasets=datasets,args=args,lock=lock)
-
-        for result in util.show_progress(pool.imap_unordered(default_arg,groups),len(groups)):
-            if not result:
-                continue
-            lock.acquire()
-            with h5py.File(self.fname, 'a') as f:
+        session = self._handle is not None
+        index   = self._get_index()
+        recipes = [self._recipe(*job) for job in jobs]
+        pool    = self._get_pool()
+        pending = collections.deque()
+        rowwise = all(func != Result._add_calculation or
+                      _compile_formula(args['formula'],tuple(sorted(args['functions'])))[2] for func,_,args in jobs)
+        outputs = {}                                                                                # label: [job,dataset,meta,written blocks]
+        index_rows = {}
+
+        def _complete(group,rows,blocks,run,shared,job):
+            try:
+                results = job.get()
+            finally:
+                _unlink_shared(shared.values())
+            for r,result in enumerate(results):
                 try:
-                    if self._allow_modification and result[0]+'/'+result[1]['label'] in f:
-                        dataset = f[result[0]+'/'+result[1]['label']]
-                        dataset[...] = result[1]['data']
-                        dataset.attrs['Overwritten'] = 'Yes' if h5py3 else \
-                                                       'Yes'.encode()
+                    label = result['label']
+                    if rows.start == 0:
+                        try:
+                            dataset = self._create_dataset(f,group,label,(index_rows[group],)+tuple(result['shape'][1:]),
+                                                           result['dtype'],recipes[run[result['job']]])
+                        except (OSError,RuntimeError,TypeError,ValueError) as err:
+                            print(f'Could not add dataset: {err}.')
+                            dataset = None
+                        outputs[label] = [run[result['job']],dataset,result['meta'],0]
+                    if label in outputs and outputs[label][1] is not None:
+                        self._write_shared(outputs[label][1],rows,result)
+                        outputs[label][3] += 1
                     else:
-                        dataset = f[result[0]].create_dataset(result[1]['label'],data=result[1]['data'])
+                        _unlink_shared([result])
+                except BaseException:
+                    _unlink_shared(results[r+1:])
+                    raise
+            if rows.stop >= index_rows[group]: _finalize(group,blocks)                              # last block of group
+
+        def _finalize(group,blocks):
+            for label,(j,dataset,meta,written) in outputs.items():
+                if dataset is None: continue
+                if written == blocks:
+                    self._finalize_dataset(dataset,group,label,meta,
+                                           self._fingerprint(recipes[j],[index[group].get(l) for l in jobs[j][1].values()]))
+                else:                                                                               # calculation failed for some rows
+                    del f[group+'/'+label]
+                    index[group].pop(label,None)
+            outputs.clear()
+
+        try:
+            with self._write() as f:
+                try:
+                    for group in util.show_progress(groups):
+                        run = self._outdated(group,jobs,recipes)
+                        if not run: continue
+                        labels = [l for l in index[group] if l in set([l for j in run for l in jobs[j][1].values()])]
+                        N = index[group][labels[0]]['shape'][0] if labels else 0
+                        index_rows[group] = N
+                        block_size = self._block_size if rowwise else max(N,1)
+                        blocks = max(1,-(-N//block_size))
+                        for b in range(0,max(N,1),block_size):
+                            rows = slice(b,min(b+block_size,N))
+                            shared = self._read_shared(f,group,labels,rows)
+                            try:
+                                job = pool.apply_async(_pointwise,([jobs[j] for j in run],shared))
+                            except BaseException:
+                                _unlink_shared(shared.values())
+                                raise
+                            pending.append((group,rows,blocks,run,shared,job))
+                            if len(pending) > 2*self._N_workers: _complete(*pending.popleft())      # limit number of blocks in memory
+                    while pending:
+                        _complete(*pending.popleft())
+                finally:
+                    while pending:                                                                  # only after an error
+                        shared,job = pending.popleft()[-2:]
+                        _unlink_shared(shared.values())
+                        try:
+                            _unlink_shared(job.get())
+                        except Exception:
+                            pass
+        finally:
+            if not session: self._close_pool()                                                      # keep workers only during a session
+
+
+    @staticmethod
+    def _recipe(func,datasets,args):
+        """
+        Return hash of a pointwise callback function with its arguments.
+
+        The hash covers the DAMASK version and the code of the callback
+        function and of functions given as arguments, i.e. modified
+        functions invalidate existing results.
+        """
+        return hashlib.sha1(json.dumps([damask.version,_code_hash(func),datasets,args],sort_keys=True,
+                                       default=lambda o: _code_hash(o) if callable(o) else str(o)).encode()).hexdigest()
 
-                    now = datetime.datetime.now().astimezone()
-                    dataset.attrs['Created'] = now.strftime('%Y-%m-%d %H:%M:%S%z') if h5py3 else \
-                                               now.strftime('%Y-%m-%d %H:%M:%S%z').encode()
 
-                    for l,v in result[1]['meta'].items():
-                        dataset.attrs[l]=v if h5py3 else v.encode()
-                    creator = dataset.attrs['Creator'] if h5py3 else \
-                              dataset.attrs['Creator'].decode()
-                    dataset.attrs['Creator'] = f"damask.Result.{creator} v{damask.version}" if h5py3 else \
-                                               f"damask.Result.{creator} v{damask.version}".encode()
+    @staticmethod
+    def _fingerprint(recipe,inputs):
+        """
+        Return fingerprint of a derived dataset.
 
-                except (OSError,RuntimeError) as err:
-                    print(f'Could not add dataset: {err}.')
-            lock.release()
+        Parameters
+        ----------
+        recipe : str
+            Hash of callback function and arguments.
+        inputs : list of dict
+            Index information of the input datasets.
 
-        pool.close()
-        pool.join()
+        """
+        state = [i['fingerprint'] if i['fingerprint'] is not None else [i['created'],i['shape'],str(i['dtype'])]
+                 for i in inputs if i is not None]
+        return recipe+':'+hashlib.sha1(json.dumps(state,default=str).encode()).hexdigest()
 
 
-    def save_XDMF(self):
+    def _outdated(self,group,jobs,recipes):
         """
-        Write XDMF file to directly visualize data in DADF5 file.
+        Return indices of jobs without up-to-date result in a group.
 
-        This works only for scalar, 3-vector and 3x3-tensor data.
-        Selection is not taken into account.
+        A result is up to date if its fingerprint matches the recipe and the
+        current state of the inputs and if none of the inputs is recalculated.
+        """
+        info     = self._get_index()[group]
+        existing = {v['fingerprint'].split(':')[0]:l for l,v in info.items() if v['fingerprint'] is not None}
+        run      = set()
+        stale    = set()
+        changed  = True
+        while changed:
+            changed = False
+            for j,(recipe,(_,datasets,_)) in enumerate(zip(recipes,jobs)):
+                if j in run: continue
+                label = existing.get(recipe)
+                if label is None or any(l in stale or l not in info for l in datasets.values()) or \
+                   info[label]['fingerprint'] != self._fingerprint(recipe,[info[l] for l in datasets.values()]):
+                    run.add(j)
+                    changed = True
+                    if label is not None: stale.add(label)
+        return sorted(run)
+
+
+    def save_DADF5(self,fname,labels=None,**policy):
         """
-        if len(self.constituents) != 1 or not self.structured:
-            raise NotImplementedError('XDMF only available for grid results with 1 constituent.')
+        Write the selected part of the DADF5 file to a new DADF5 file.
 
-        xdmf=ET.Element('Xdmf')
-        xdmf.attrib={'Version':  '2.0',
-                     'xmlns:xi': 'http://www.w3.org/2001/XInclude'}
+        The new file contains the selected increments, constituents,
+        materialpoints, and physics together with the complete geometry
+        and mapping. Datasets are written chunk-wise according to the
+        storage policy; gzip compression of the chunks is done in
+        DAMASK_NUM_THREADS threads.
 
-        domain=ET.SubElement(xdmf, 'Domain')
+        Parameters
+        ----------
+        fname : str or pathlib.Path
+            Name of the new DADF5 file.
+        labels : str or list of str, optional
+            Labels of the datasets to copy. Defaults to all datasets.
+            The displacements 'u_n' and 'u_p' are always copied.
+        **policy
+            Storage policy of the new file, see set_storage.
+            Defaults to the storage policy of the Result object.
+
+        Examples
+        --------
+        Extract the stress of the last increment with single precision.
 
-        collection = ET.SubElement(domain, 'Grid')
-        collection.attrib={'GridType':       'Collection',
-                           'CollectionType': 'Temporal'}
+        >>> r = damask.Result('my_file.hdf5')
+        >>> r.pick('increments',r.increments[-1:])
+        >>> r.save_DADF5('my_file_last.hdf5',['sigma'],float32=True)
 
-        time = ET.SubElement(collection, 'Time')
-        time.attrib={'TimeType': 'List'}
+        """
+        if Path(fname).absolute() == self.fname:
+            raise ValueError('output file must not be the DADF5 file')
+        labels = labels if labels is None or isinstance(labels,list) else [labels]
+        index = self._get_index()
 
-        time_data = ET.SubElement(time, 'DataItem')
-        time_data.attrib={'Format':     'XML',
-                          'NumberType': 'Float',
-                          'Dimensions': f'{len(self.times)}'}
-        time_data.text = ' '.join(map(str,self.times))
+        num_threads = damask.environment.options['DAMASK_NUM_THREADS']
+        N_threads = int(num_threads) if num_threads is not None else os.cpu_count()
+        with self.storage(**policy), self._read() as f_in, h5py.File(fname,'w') as f_out, \
+             ThreadPool(N_threads) as pool:
 
-        attributes = []
-        data_items = []
+            for k,v in f_in.attrs.items(): f_out.attrs[k] = v
+            for g in ['geometry','mapping']: f_in.copy(g,f_out)                                    # soft links are kept
 
-        for inc in self.increments:
+            for i in util.show_progress(self.selection['increments']):
+                f_out.create_group(i)
+                for k,v in f_in[i].attrs.items(): f_out[i].attrs[k] = v
 
-            grid=ET.SubElement(collection,'Grid')
-            grid.attrib = {'GridType': 'Uniform',
-                           'Name':      inc}
+                groups = {f'{i}/geometry':f'{i}/geometry'}
+                for o,p in zip(['constituents','materialpoints'],['con_physics','mat_physics']):
+                    link = f_in[i].get(o[:-1],getlink=True)
+                    if link is None: continue
+                    if isinstance(link,h5py.SoftLink):
+                        f_out[i][o[:-1]] = h5py.SoftLink(link.path)
+                    target = link.path if isinstance(link,h5py.SoftLink) else f'/{i}/{o[:-1]}'
+                    for oo in self.selection[o]:
+                        for pp in self.selection[p]:
+                            if '/'.join([i,o[:-1],oo,pp]) in index:
+                                groups['/'.join([i,o[:-1],oo,pp])] = '/'.join([target,oo,pp])
+
+                for group,target in groups.items():
+                    f_out.require_group(target)
+                    for k,v in f_in[group].attrs.items(): f_out[target].attrs[k] = v
+                    for label in index[group]:
+                        if labels is None or label in labels or group == f'{i}/geometry' and label in ['u_n','u_p']:
+                            self._copy_dataset(f_in[group][label],f_out[target],label,pool,2*N_threads)
+
+
+    def _copy_dataset(self,src,dst,name,pool,N_pending):
+        """Copy a dataset chunk by chunk according to the storage policy."""
+        options = self._storage_options(src.shape,src.dtype)
+        dataset = dst.create_dataset(name,shape=src.shape,**options)
+        for k,v in src.attrs.items(): dataset.attrs[k] = v
+
+        rows = options['chunks'][0]
+        chunks = ((r,src[r:r+rows].astype(options['dtype'],copy=False)) for r in range(0,src.shape[0],rows))
+        if options.get('compression') != 'gzip':
+            for r,data in chunks: dataset[r:r+len(data)] = data
+            return
 
-            topology=ET.SubElement(grid, 'Topology')
-            topology.attrib={'TopologyType': '3DCoRectMesh',
-                             'Dimensions':   '{} {} {}'.format(*self.grid+1)}
+        pending = collections.deque()
+        for r,data in chunks:
+            if len(data) < rows:
+                data = np.concatenate((data,np.zeros((rows-len(data),)+data.shape[1:],data.dtype)))  # chunks are stored complete
+            pending.append((r,pool.apply_async(_deflate_chunk,(data,options['shuffle'],options['compression_opts']))))
+            while len(pending) > N_pending or pending and pending[0][1].ready():
+                r_,compressed = pending.popleft()
+                dataset.id.write_direct_chunk((r_,)+(0,)*(len(src.shape)-1),compressed.get())
+        for r_,compressed in pending:
+            dataset.id.write_direct_chunk((r_,)+(0,)*(len(src.shape)-1),compressed.get())
 
-            geometry=ET.SubElement(grid, 'Geometry')
-            geometry.attrib={'GeometryType':'Origin_DxDyDz'}
 
-            origin=ET.SubElement(geometry, 'DataItem')
-            origin.attrib={'Format':     'XML',
-                           'NumberType': 'Float',
-                           'Dimensions': '3'}
-            origin.text="{} {} {}".format(*self.origin)
+    def save_columns(self,labels,fname=None,format=None,c=0,block_size=65536):
+        """
+        Export datasets of the selected increments in columnar format.
 
-            delta=ET.SubElement(geometry, 'DataItem')
-            delta.attrib={'Format':     'XML',
-                          'NumberType': 'Float',
-                          'Dimensions': '3'}
-            delta.text="{} {} {}".format(*(self.size/self.grid))
+        The data is streamed in blocks of cells, i.e. no table of all data is built.
+        Each row corresponds to a cell of an increment, given by the columns
+        'increment', 'time', and 'cell'. Shapes and units of the datasets are
+        stored as metadata.
 
+        Parameters
+        ----------
+        labels : str or list of str
+            Labels of the datasets to export.
+        fname : str or pathlib.Path, optional
+            Name of the output file. Defaults to the name of the DADF5 file
+            with suffix '_columns' and the extension of the format in the
+            current working directory.
+            For 'npz', one file per increment is written and the increment
+            is appended to the name.
+        format : {'parquet', 'hdf5', 'npz'}, optional
+            Output format. Defaults to 'parquet' (Apache Parquet, requires pyarrow)
+            if pyarrow is available and to 'hdf5' otherwise.
+        c : int, optional
+            Constituent to consider. Defaults to 0.
+        block_size : int, optional
+            Number of cells exported at once. Defaults to 65536.
 
-            with h5py.File(self.fname,'r') as f:
-                attributes.append(ET.SubElement(grid, 'Attribute'))
-                attributes[-1].attrib={'Name':          'u',
-                                       'Center':        'Node',
-                                       'AttributeType': 'Vector'}
-                data_items.append(ET.SubElement(attributes[-1], 'DataItem'))
-                data_items[-1].attrib={'Format':     'HDF',
-                                       'Precision':  '8',
-                                       'Dimensions': '{} {} {} 3'.format(*(self.grid+1))}
-                data_items[-1].text=f'{os.path.split(self.fname)[1]}:/{inc}/geometry/u_n'
+        """
+        if format is None:
+            try:
+                import pyarrow                                                                      # noqa
+                format = 'parquet'
+            except ImportError:
+                format = 'hdf5'
+        if format not in ['parquet','hdf5','npz']:
+            raise ValueError(f'invalid format "{format}"')
+        if format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+        labels = labels if isinstance(labels,list) else [labels]
+        fname = Path(fname if fname is not None else f'{self.fname.stem}_columns.{format}')
+        if fname.absolute() == self.fname:
+            raise ValueError('output file must not be the DADF5 file')
+        index = self._get_index()
+
+        locations = {}
+        for i in self.selection['increments']:
+            locations[i] = {}
+            for label in labels:
+                locations[i][label] = [f'{i}/geometry/{label}'] if label in index.get(f'{i}/geometry',{}) else \
+                                      [f'{g}/{label}' for g in self._selected_groups([i]) if label in index[g]]
+                if not locations[i][label]:
+                    raise ValueError(f'dataset "{label}" not found in increment "{i}"')
+                if locations[i][label][0].split('/')[1] == 'geometry' and \
+                   index[f'{i}/geometry'][label]['shape'][0] != self.Nmaterialpoints:
+                    raise ValueError(f'dataset "{label}" is not defined at cells')
+
+        first = {label:index[loc.rsplit('/',1)[0]][label] for label,(loc,*_) in next(iter(locations.values())).items()}
+        shapes = {label:first[label]['shape'][1:] + (() if first[label]['dtype'].names is None else
+                                                     (len(first[label]['dtype'].names),))
+                  for label in labels}
+        metadata = {'shapes':{label:list(shape) for label,shape in shapes.items()},
+                    'units': {label:first[label]['unit'] for label in labels}}
+
+        def blocks(i):
+            for columns in zip(*[self.read_dataset_blocks(locations[i][label],c,True,block_size) for label in labels]):
+                cells = columns[0][0]
+                yield {'increment': np.full(cells.stop-cells.start,int(i[3:]),np.int32),
+                       'time':      np.full(cells.stop-cells.start,self.times[self.increments.index(i)]),
+                       'cell':      np.arange(cells.start,cells.stop),
+                       **{label:d.reshape((len(d),)+shapes[label]) for label,(_,d) in zip(labels,columns)}}
+
+        if format == 'parquet':
+            def column(v):
+                v = v.reshape(len(v),-1)
+                return pa.array(v[:,0]) if v.shape[1] == 1 else \
+                       pa.FixedSizeListArray.from_arrays(pa.array(v.reshape(-1)),v.shape[1])
+
+            writer = None
+            try:
+                for i in util.show_progress(locations):
+                    for block in blocks(i):
+                        table = pa.table({k:column(v) for k,v in block.items()})
+                        if writer is None:
+                            writer = pq.ParquetWriter(fname,table.schema.with_metadata({'damask':json.dumps(metadata)}))
+                        writer.write_table(table.cast(writer.schema))
+            finally:
+                if writer is not None: writer.close()
+
+        elif format == 'hdf5':
+            with h5py.File(fname,'w') as f:
+                for i in util.show_progress(locations):
+                    for block in blocks(i):
+                        for k,v in block.items():
+                            if k not in f:
+                                f.create_dataset(k,(0,)+v.shape[1:],v.dtype,maxshape=(None,)+v.shape[1:],
+                                                 chunks=(min(block_size,max(len(v),1)),)+v.shape[1:],
+                                                 compression='gzip',shuffle=True)
+                                if k in labels and metadata['units'][k] is not None:
+                                    f[k].attrs['Unit'] = metadata['units'][k] if h5py3 else \
+                                                         metadata['units'][k].encode()
+                            f[k].resize(f[k].shape[0]+len(v),axis=0)
+                            f[k][-len(v):] = v
 
-                for o,p in zip(['constituents','materialpoints'],['con_physics','mat_physics']):
-                    for oo in getattr(self,o):
-                        for pp in getattr(self,p):
-                            g = '/'.join([inc,o[:-1],oo,pp])
-                            for l in f[g]:
-                                name = '/'.join([g,l])
-                                shape = f[name].shape[1:]
-                                dtype = f[name].dtype
-                                prec  = f[name].dtype.itemsize
-
-                                if (shape not in [(1,), (3,), (3,3)]) or dtype != np.float64: continue
-
-                                attributes.append(ET.SubElement(grid, 'Attribute'))
-                                attributes[-1].attrib={'Name':          name.split('/',2)[2],
-                                                       'Center':        'Cell',
-                                                       'AttributeType': 'Tensor'}
-                                data_items.append(ET.SubElement(attributes[-1], 'DataItem'))
-                                data_items[-1].attrib={'Format':     'HDF',
-                                                       'NumberType': 'Float',
-                                                       'Precision':  f'{prec}',
-                                                       'Dimensions': '{} {} {} {}'.format(*self.grid,np.prod(shape))}
-                                data_items[-1].text=f'{os.path.split(self.fname)[1]}:{name}'
+        else:
+            N_digits = int(np.floor(np.log10(max(1,int(self.increments[-1][3:])))))+1
+            for i in util.show_progress(locations):
+                columns = {}
+                for block in blocks(i):
+                    for k,v in block.items(): columns.setdefault(k,[]).append(v)
+                np.savez_compressed(fname.with_name(f'{fname.stem}_inc{i[3:].zfill(N_digits)}{fname.suffix}'),
+                                    **{k:np.concatenate(v) for k,v in columns.items()})
+
+
+    def save_XDMF(self,append=False):
+        """
+        Write XDMF file to directly visualize data in DADF5 file.
+
+        The XDMF file is written to the current working directory and refers to the
+        selected datasets in the DADF5 file, i.e. no data is copied.
+        This works only for scalar, 3-vector and 3x3-tensor data.
+        If the datasets of a constituent or materialpoint do not cover all cells in
+        their natural order, e.g. for multiple phases, each constituent and materialpoint
+        is represented by a subgrid whose topology is stored in an accompanying HDF5 file,
+        which is written only in that case.
+
+        Parameters
+        ----------
+        append : bool, optional
+            Add only selected increments that are not contained in the existing
+            XDMF file. Defaults to False.
+
+        """
+        fname = os.path.split(self.fname)[1]
+        fname_topology = f'{self.fname.stem}_topology.hdf5'
+        index = self._get_index()
+
+        if append and os.path.isfile(self.fname.with_suffix('.xdmf').name):
+            xdmf = ET.parse(self.fname.with_suffix('.xdmf').name).getroot()
+            xdmf.attrib['xmlns:xi'] = 'http://www.w3.org/2001/XInclude'                             # namespace is dropped by parser
+            for e in xdmf.iter():                                                                   # remove pretty printing
+                if e.text is not None and e.text.strip() == '': e.text = None
+                e.tail = None
+            collection = xdmf.find('Domain/Grid')
+            time_data = collection.find('Time/DataItem')
+        else:
+            xdmf=ET.Element('Xdmf')
+            xdmf.attrib={'Version':  '2.0',
+                         'xmlns:xi': 'http://www.w3.org/2001/XInclude'}
+
+            domain=ET.SubElement(xdmf, 'Domain')
+
+            collection = ET.SubElement(domain, 'Grid')
+            collection.attrib={'GridType':       'Collection',
+                               'CollectionType': 'Temporal'}
+
+            time = ET.SubElement(collection, 'Time')
+            time.attrib={'TimeType': 'List'}
+
+            time_data = ET.SubElement(time, 'DataItem')
+            time_data.attrib={'Format':     'XML',
+                              'NumberType': 'Float'}
+
+        existing = [g.attrib['Name'] for g in collection.findall('Grid')]
+        increments = [i for i in self.increments if i in existing or i in self.selection['increments']]
+        time_data.attrib['Dimensions'] = f'{len(increments)}'
+        time_data.text = ' '.join([str(self.times[self.increments.index(i)]) for i in increments])
+
+        def add_attribute(grid,name,center,path,dimensions):
+            shape = index[path.rsplit('/',1)[0]][path.rsplit('/',1)[1]]['shape'][1:]
+            attribute = ET.SubElement(grid, 'Attribute')
+            attribute.attrib={'Name':          name,
+                              'Center':        center,
+                              'AttributeType': {(1,):'Scalar',(3,):'Vector',(3,3):'Tensor'}[shape]}
+            data_item = ET.SubElement(attribute, 'DataItem')
+            data_item.attrib={'Format':     'HDF',
+                              'NumberType': 'Float',
+                              'Precision':  f'{index[path.rsplit("/",1)[0]][path.rsplit("/",1)[1]]["dtype"].itemsize}',
+                              'Dimensions': ' '.join(map(str,dimensions+[np.prod(shape)]))}
+            data_item.text=f'{fname}:/{path}'
+
+        def add_topology(grid,key,N_cells):
+            topology=ET.SubElement(grid, 'Topology')
+            topology.attrib={'TopologyType':     cell_type,
+                             'NumberOfElements': f'{N_cells}'}
+            data_item = ET.SubElement(topology, 'DataItem')
+            data_item.attrib={'Format':     'HDF',
+                              'NumberType': 'Int',
+                              'Precision':  '8',
+                              'Dimensions': f'{N_cells} {N_nodes}'}
+            data_item.text=f'{fname_topology}:/connectivity/{key}'
+
+            geometry=ET.SubElement(grid, 'Geometry')
+            geometry.attrib={'GeometryType':'XYZ'}
+            data_item = ET.SubElement(geometry, 'DataItem')
+            data_item.attrib={'Format':     'HDF',
+                              'NumberType': 'Float',
+                              'Precision':  '8',
+                              'Dimensions': f'{len(self.node_coordinates)} 3'}
+            data_item.text=f'{fname_topology}:/x_n'
+
+        if self.structured:
+            cell_type,N_nodes = 'Hexahedron',8
+            corners = np.array([[0,0,0],[1,0,0],[1,1,0],[0,1,0],[0,0,1],[1,0,1],[1,1,1],[0,1,1]])
+            ijk = np.array(np.unravel_index(np.arange(np.prod(self.grid)),self.grid,order='F')).T
+            connectivity = np.ravel_multi_index((ijk[:,np.newaxis,:]+corners).T,self.grid+1,order='F').T
+        else:
+            with self._read() as f:
+                connectivity = f['/geometry/T_c'][()]-1
+                cell_type = {'HEXAHEDRON':'Hexahedron','TETRA':'Tetrahedron','WEDGE':'Wedge',
+                             'QUAD':'Quadrilateral','TRIANGLE':'Triangle'}\
+                            [f['/geometry/T_c'].attrs['VTK_TYPE'].decode().split('_',1)[-1].upper()]
+            N_nodes = connectivity.shape[1]
+        N_cells = len(connectivity)
+
+        f_topology = None                                                                           # created only if subgrids are needed
+        try:
+            for inc in increments:
+                if inc in existing: continue
+
+                datasets = {}
+                for g in self._selected_groups([inc]):
+                    datasets.setdefault(tuple(g.split('/')[1:3]),[]) \
+                            .extend([f'{g}/{l}' for l,info in index[g].items()
+                                     if info['shape'][1:] in [(1,), (3,), (3,3)]
+                                     and info['dtype'] in [np.float32,np.float64]])
+                cells = {k:self._cells_in_order(*k) for k,v in datasets.items() if len(v) > 0}
+                cells = {k:v for k,v in cells.items() if len(v) > 0}
+                natural = self.structured and all(np.array_equal(v,np.arange(N_cells)) for v in cells.values())
+
+                grid=ET.SubElement(collection,'Grid')
+                grid.attrib = {'GridType': 'Uniform' if natural else 'Collection',
+                               'Name':      inc}
+                if not natural: grid.attrib['CollectionType'] = 'Spatial'
+
+                if natural:
+                    topology=ET.SubElement(grid, 'Topology')
+                    topology.attrib={'TopologyType': '3DCoRectMesh',
+                                     'Dimensions':   '{} {} {}'.format(*self.grid+1)}
+
+                    geometry=ET.SubElement(grid, 'Geometry')
+                    geometry.attrib={'GeometryType':'Origin_DxDyDz'}
+
+                    origin=ET.SubElement(geometry, 'DataItem')
+                    origin.attrib={'Format':     'XML',
+                                   'NumberType': 'Float',
+                                   'Dimensions': '3'}
+                    origin.text="{} {} {}".format(*self.origin)
+
+                    delta=ET.SubElement(geometry, 'DataItem')
+                    delta.attrib={'Format':     'XML',
+                                  'NumberType': 'Float',
+                                  'Dimensions': '3'}
+                    delta.text="{} {} {}".format(*(self.size/self.grid))
+
+                    subgrids = {k:grid for k in cells}
+                    if 'u_n' in index.get(f'{inc}/geometry',{}):
+                        add_attribute(grid,'u','Node',f'{inc}/geometry/u_n',list(self.grid+1))
+                else:
+                    if f_topology is None:
+                        f_topology = h5py.File(fname_topology,'a' if append else 'w')
+                        if 'x_n' not in f_topology: f_topology.create_dataset('x_n',data=self.node_coordinates)
+                    subgrids = {}
+                    for k,c in cells.items():
+                        key = '/'.join(k)
+                        if f'connectivity/{key}' not in f_topology:
+                            f_topology.create_dataset(f'connectivity/{key}',data=connectivity[c])
+                        subgrids[k] = ET.SubElement(grid,'Grid')
+                        subgrids[k].attrib = {'GridType': 'Uniform',
+                                              'Name':      key}
+                        add_topology(subgrids[k],key,len(c))
+                        if 'u_n' in index.get(f'{inc}/geometry',{}):
+                            add_attribute(subgrids[k],'u','Node',f'{inc}/geometry/u_n',
+                                          [len(self.node_coordinates)])
+
+                for k in cells:
+                    for d in datasets[k]:
+                        add_attribute(subgrids[k],d.split('/',2)[2],'Cell',d,
+                                      list(self.grid) if natural else [len(cells[k])])
+        finally:
+            if f_topology is not None: f_topology.close()
+
+        grids = collection.findall('Grid')                                                          # keep grids in order of time
+        for grid in grids: collection.remove(grid)
+        collection.extend(sorted(grids,key=lambda g: self.increments.index(g.attrib['Name'])))
 
         with open(self.fname.with_suffix('.xdmf').name,'w') as f:
             f.write(xml.dom.minidom.parseString(ET.tostring(xdmf).decode()).toprettyxml())
 
 
+    def _cells_in_order(self,kind,name):
+        """
+        Return cells corresponding to the rows of the datasets of a constituent or materialpoint.
+
+        Parameters
+        ----------
+        kind : str
+            Either 'constituent' or 'materialpoint'.
+        name : str
+            Name of the constituent or materialpoint.
+
+        """
+        N_constituents = self._get_mapping_table(kind)['ID'].shape[1] if kind == 'constituent' else 1
+        cells,positions = zip(*[self._get_mapping(kind,name,c) for c in range(N_constituents)])
+        return np.concatenate(cells)[np.argsort(np.concatenate(positions),kind='stable')]
+
+
     def save_vtk(self,labels=[],mode='cell'):
         """
         Export to vtk cell/point data.
 
+        One file per selected increment is written. Reading, assembling, and
+        writing of different increments is done in parallel by a pool of
+        DAMASK_NUM_THREADS worker processes, but by at most one process per
+        increment. A single increment is exported without starting a pool.
+
         Parameters
         ----------
         labels : str or list of, optional
@@ -1236,63 +3319,209 @@ class Result:
             Defaults to 'cell'.
 
         """
-        if mode.lower()=='cell':
-
-            if self.structured:
-                v = VTK.from_rectilinear_grid(self.grid,self.size,self.origin)
-            else:
-                with h5py.File(self.fname,'r') as f:
-                    v = VTK.from_unstructured_grid(f['/geometry/x_n'][()],
-                                                   f['/geometry/T_c'][()]-1,
-                                                   f['/geometry/T_c'].attrs['VTK_TYPE'].decode())
-        elif mode.lower()=='point':
-            v = VTK.from_poly_data(self.cell_coordinates)
+        if mode.lower() not in ['cell','point']:
+            raise ValueError(f'invalid mode "{mode}"')
 
         N_digits = int(np.floor(np.log10(max(1,int(self.increments[-1][3:])))))+1
+        exports = [(f'{self.fname.stem}_inc{inc[3:].zfill(N_digits)}',datasets)
+                   for inc,datasets in self._vtk_datasets(labels,mode.lower())]
 
-        for inc in util.show_progress(self.iterate('increments'),len(self.selection['increments'])):
-
-            materialpoints_backup = self.selection['materialpoints'].copy()
-            self.pick('materialpoints',False)
-            for label in (labels if isinstance(labels,list) else [labels]):
-                for p in self.iterate('con_physics'):
-                    if p != 'generic':
-                        for c in self.iterate('constituents'):
-                            x = self.get_dataset_location(label)
-                            if len(x) == 0:
-                                continue
-                            array = self.read_dataset(x,0)
-                            v.add(array,'1_'+x[0].split('/',1)[1]) #ToDo: hard coded 1!
-                    else:
-                        x = self.get_dataset_location(label)
-                        if len(x) == 0:
-                            continue
-                        array = self.read_dataset(x,0)
-                        ph_name = re.compile(r'(?<=(constituent\/))(.*?)(?=(generic))')             # identify  phase name
-                        dset_name = '1_' + re.sub(ph_name,r'',x[0].split('/',1)[1])                 # removing phase name
-                        v.add(array,dset_name)
-            self.pick('materialpoints',materialpoints_backup)
-
-            constituents_backup = self.selection['constituents'].copy()
-            self.pick('constituents',False)
-            for label in (labels if isinstance(labels,list) else [labels]):
-                for p in self.iterate('mat_physics'):
-                    if p != 'generic':
-                        for m in self.iterate('materialpoints'):
-                            x = self.get_dataset_location(label)
-                            if len(x) == 0:
-                                continue
-                            array = self.read_dataset(x,0)
-                            v.add(array,'1_'+x[0].split('/',1)[1]) #ToDo: why 1_?
+        num_threads = damask.environment.options['DAMASK_NUM_THREADS']
+        N_workers = min(int(num_threads) if num_threads is not None else mp.cpu_count(),len(exports))
+        if N_workers <= 1:
+            _init_vtk_export(self,mode.lower())
+            try:
+                for fname,datasets in util.show_progress(exports):
+                    _save_vtk_increment(fname,datasets)
+            finally:
+                _vtk_export.clear()
+            return
+
+        with self._suspend():                                                                       # forked workers must not inherit the handle
+            pool = mp.Pool(N_workers,_init_vtk_export,(self,mode.lower()))
+        try:
+            pending = collections.deque()
+            for fname,datasets in util.show_progress(exports):
+                if len(pending) >= 2*N_workers:                                                     # limit number of increments in memory
+                    pending.popleft().get()
+                pending.append(pool.apply_async(_save_vtk_increment,(fname,datasets)))
+            while pending:
+                pending.popleft().get()
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+    def save_VTKHDF(self,labels=[],mode='cell',fname=None,float32=False):
+        """
+        Export selected increments to a single VTKHDF file.
+
+        Geometry and topology are written only once, data of each
+        increment is stored as one time step. Grid solver results
+        are written as image data, mesh solver results and point
+        data as unstructured grid.
+
+        Parameters
+        ----------
+        labels : str or list of, optional
+            Labels of the datasets to be exported.
+        mode : str, either 'cell' or 'point'
+            Export in cell format or point format.
+            Defaults to 'cell'.
+        fname : str or pathlib.Path, optional
+            Name of the output file. Defaults to the name of the DADF5 file
+            with extension '.vtkhdf' in the current working directory.
+        float32 : bool, optional
+            Store floating point data in single precision to reduce the file size.
+            Defaults to False.
+
+        Notes
+        -----
+        Time series in VTKHDF files require ParaView 5.12 or newer.
+        Since HDF5 does not allow '/' in dataset names, it is replaced
+        by '_' in the array names.
+
+        """
+        if mode.lower() not in ['cell','point']:
+            raise ValueError(f'invalid mode "{mode}"')
+
+        def attribute(group,name,value):
+            group.attrs.create(name,value.encode('ascii'),dtype=h5py.string_dtype('ascii',len(value)))
+
+        exports = self._vtk_datasets(labels,mode.lower())
+        image = mode.lower() == 'cell' and self.structured
+        N_steps = len(exports)
+
+        with h5py.File(self.fname.with_suffix('.vtkhdf').name if fname is None else fname,'w') as f_out:
+            root = f_out.create_group('VTKHDF')
+            root.attrs['Version'] = np.array([2,0],np.int64)
+            if image:
+                attribute(root,'Type','ImageData')
+                root.attrs['WholeExtent'] = np.array([[0,g] for g in self.grid],np.int64).ravel()
+                root.attrs['Origin'] = self.origin.astype(np.float64)
+                root.attrs['Spacing'] = (self.size/self.grid).astype(np.float64)
+                root.attrs['Direction'] = np.eye(3).ravel()
+                N = {'PointData':np.prod(self.grid+1),'CellData':np.prod(self.grid)}
+            else:
+                attribute(root,'Type','UnstructuredGrid')
+                if mode.lower() == 'cell':
+                    with self._read() as f:
+                        nodes = f['/geometry/x_n'][()]
+                        connectivity = f['/geometry/T_c'][()]-1
+                        cell_type = VTK.from_unstructured_grid(nodes[:1],np.zeros((1,connectivity.shape[1]),int),
+                                                               f['/geometry/T_c'].attrs['VTK_TYPE'].decode())
+                    types = np.full(len(connectivity),cell_type.vtk_data.GetCellType(0),np.uint8)
+                else:
+                    nodes = self.cell_coordinates
+                    connectivity = np.arange(len(nodes)).reshape(-1,1)
+                    types = np.ones(len(nodes),np.uint8)                                            # VTK_VERTEX
+                root.create_dataset('NumberOfPoints',data=[len(nodes)])
+                root.create_dataset('NumberOfCells',data=[len(connectivity)])
+                root.create_dataset('NumberOfConnectivityIds',data=[connectivity.size])
+                root.create_dataset('Points',data=nodes.astype(np.float64))
+                root.create_dataset('Connectivity',data=connectivity.ravel().astype(np.int64))
+                root.create_dataset('Offsets',data=np.arange(0,connectivity.size+1,connectivity.shape[1]))
+                root.create_dataset('Types',data=types)
+                N = {'PointData':len(nodes),'CellData':len(connectivity)}
+
+            steps = root.create_group('Steps')
+            steps.attrs['NSteps'] = N_steps
+            steps.create_dataset('Values',data=[self.times[self.increments.index(inc)] for inc,_ in exports])
+            if not image:
+                steps.create_dataset('PartOffsets',data=np.zeros(N_steps,np.int64))                 # geometry is shared by all steps
+                steps.create_dataset('NumberOfParts',data=np.ones(N_steps,np.int64))
+                steps.create_dataset('PointOffsets',data=np.zeros(N_steps,np.int64))
+                steps.create_dataset('CellOffsets',data=np.zeros((N_steps,1),np.int64))
+                steps.create_dataset('ConnectivityIdOffsets',data=np.zeros((N_steps,1),np.int64))
+
+            for step,(inc,datasets) in enumerate(util.show_progress(exports)):
+                for label,x in datasets:
+                    name = label.replace('/','_')
+                    data = self.read_dataset(x,0)
+                    if data.dtype.names is not None:
+                        data = rfn.structured_to_unstructured(data)
+                    if float32 and np.issubdtype(data.dtype,np.floating):
+                        data = data.astype(np.float32)
+                    data = data.reshape(len(data),-1)
+                    kind = 'PointData' if len(data) == N['PointData'] else \
+                           'CellData'  if len(data) == N['CellData']  else None
+                    if kind is None:
+                        raise ValueError(f'Cell / point count ({N["CellData"]} / {N["PointData"]}) '
+                                         f'differs from data ({len(data)}).')
+                    if name not in root.require_group(kind):
+                        if image:
+                            extent = self.grid[::-1]+(1 if kind == 'PointData' else 0)
+                            shape = (N_steps,*extent,data.shape[1])
+                            chunks = (1,*extent,data.shape[1])
+                        else:
+                            shape = (N_steps*len(data),data.shape[1])
+                            chunks = (len(data),data.shape[1])
+                        root[kind].create_dataset(name,shape,data.dtype,chunks=chunks,
+                                                  fillvalue=np.nan if data.dtype.kind == 'f' else 0,
+                                                  compression='gzip',shuffle=True)
+                        steps.require_group(kind+'Offsets').create_dataset(name,data=np.arange(N_steps)
+                                                                           *(1 if image else len(data)))
+                    if image:
+                        root[kind][name][step] = data.reshape(root[kind][name].shape[1:])
                     else:
-                        x = self.get_dataset_location(label)
-                        if len(x) == 0:
-                            continue
-                        array = self.read_dataset(x,0)
-                        v.add(array,'1_'+x[0].split('/',1)[1])
-            self.pick('constituents',constituents_backup)
+                        root[kind][name][step*len(data):(step+1)*len(data)] = data
+
+
+    def _vtk_datasets(self,labels,mode):
+        """
+        Return VTK names and locations of the datasets to export for each selected increment.
+
+        Parameters
+        ----------
+        labels : str or list of
+            Labels of the datasets to be exported.
+        mode : str, either 'cell' or 'point'
+            Export in cell format or point format.
 
-            u = self.read_dataset(self.get_dataset_location('u_n' if mode.lower() == 'cell' else 'u_p'))
-            v.add(u,'u')
+        Returns
+        -------
+        exports : list of tuple
+            Increment and list of (name, locations) pairs.
 
-            v.save(f'{self.fname.stem}_inc{inc[3:].zfill(N_digits)}')
+        """
+        index = self._get_index()
+        ph_name = re.compile(r'(?<=(constituent\/))(.*?)(?=(generic))')                             # identify phase name
+        exports = []
+        for inc in self.selection['increments']:
+            datasets = {}
+            for o,p,kind in [('constituents','con_physics','constituent'),
+                             ('materialpoints','mat_physics','materialpoint')]:
+                for label in (labels if isinstance(labels,list) else [labels]):
+                    geometry = [f'{inc}/geometry/{label}'] if label in index.get(f'{inc}/geometry',{}) else []
+                    for pp in self.selection[p]:
+                        located = [[f'{inc}/{kind}/{oo}/{pp}/{label}']
+                                   if label in index.get(f'{inc}/{kind}/{oo}/{pp}',{}) else []
+                                   for oo in self.selection[o]]
+                        if pp != 'generic':
+                            for x in [geometry+l for l in located if len(geometry+l) > 0]:
+                                datasets['1_'+x[0].split('/',1)[1]] = x                             #ToDo: hard coded 1!
+                        elif len(geometry+sum(located,[])) > 0:
+                            x = geometry+sum(located,[])
+                            name = x[0].split('/',1)[1]
+                            datasets['1_'+(re.sub(ph_name,r'',name) if kind == 'constituent' else name)] = x
+
+            u = 'u_n' if mode == 'cell' else 'u_p'
+            datasets['u'] = [f'{inc}/geometry/{u}'] if u in index.get(f'{inc}/geometry',{}) else []
+
+            exports.append((inc,list(datasets.items())))
+        return exports
+
+
+    def _vtk_geometry(self,mode):
+        """Return VTK object without data for cell or point export."""
+        if mode == 'cell':
+            if self.structured:
+                return VTK.from_rectilinear_grid(self.grid,self.size,self.origin)
+            else:
+                with self._read() as f:
+                    return VTK.from_unstructured_grid(f['/geometry/x_n'][()],
+                                                      f['/geometry/T_c'][()]-1,
+                                                      f['/geometry/T_c'].attrs['VTK_TYPE'].decode())
+        else:
+            return VTK.from_poly_data(self.cell_coordinates)
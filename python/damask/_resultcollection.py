@@ -0,0 +1,241 @@
+import multiprocessing as mp
+import glob
+
+import numpy as np
+
+import damask
+from . import Result
+
+
+def _call(result,method,args,kwargs):
+    """Call a method of a Result object in a worker process."""
+    return getattr(result,method)(*args,**kwargs)
+
+
+def _apply(func,result,args,kwargs):
+    """Apply a function to a Result object in a worker process."""
+    return func(result,*args,**kwargs)
+
+
+def _read_increments(result,label,c,plain):
+    """Read a dataset for each selected increment of a Result object."""
+    locations = result.get_dataset_location(label)
+    data = []
+    for i in result.selection['increments']:
+        paths = [p for p in locations if p.split('/')[0] == i]
+        if not paths:
+            raise ValueError(f'dataset "{label}" not found in increment "{i}" of "{result.fname}"')
+        data.append(result.read_dataset(paths,c,plain))
+    return np.stack(data)
+
+
+class ResultCollection:
+    """
+    Collection of DADF5 files, e.g. of a parameter sweep.
+
+    Selections apply to all files. Evaluations are done per file in
+    DAMASK_NUM_THREADS worker processes and returned as dictionaries
+    keyed by file name.
+    """
+
+    def __init__(self,fnames):
+        """
+        Index DADF5 files.
+
+        Only the metadata of the files is read.
+
+        Parameters
+        ----------
+        fnames : str or list of str or pathlib.Path
+            Names of the DADF5 files or a (wildcard) pattern matching them.
+
+        """
+        fnames = sorted(glob.glob(fnames)) if isinstance(fnames,str) else fnames
+        if len(fnames) == 0:
+            raise ValueError('no DADF5 files given')
+        self.results = {str(f):Result(f) for f in fnames}
+
+
+    def __repr__(self):
+        """Show summary of the files."""
+        return '\n'.join([f'{f}: {len(r.selection["increments"])}/{len(r.increments)} increments '
+                          f'({t[0]}s to {t[-1]}s)' for f,r in self.results.items()
+                          for t in [r._times_of(r.increments[:1]+r.increments[-1:])]])
+
+
+    def __len__(self):
+        """Number of files."""
+        return len(self.results)
+
+
+    def __iter__(self):
+        """Iterate over file names."""
+        return iter(self.results)
+
+
+    def __getitem__(self,fname):
+        """Result object of a file."""
+        return self.results[str(fname)]
+
+
+    @property
+    def increments(self):
+        """Increments of each file."""
+        return {f:r.increments for f,r in self.results.items()}
+
+
+    @property
+    def times(self):
+        """Times of the increments of each file."""
+        return {f:r.times for f,r in self.results.items()}
+
+
+    def pick(self,what,datasets):
+        """
+        Set selection of all files.
+
+        Parameters
+        ----------
+        what : str
+            attribute to change (must be from Result.selection)
+        datasets : list of str or bool
+            name of datasets as list, supports ? and * wildcards.
+            True is equivalent to [*], False is equivalent to []
+
+        """
+        for r in self.results.values(): r.pick(what,datasets)
+
+
+    def pick_more(self,what,datasets):
+        """
+        Add to selection of all files.
+
+        Parameters
+        ----------
+        what : str
+            attribute to change (must be from Result.selection)
+        datasets : list of str or bool
+            name of datasets as list, supports ? and * wildcards.
+            True is equivalent to [*], False is equivalent to []
+
+        """
+        for r in self.results.values(): r.pick_more(what,datasets)
+
+
+    def pick_less(self,what,datasets):
+        """
+        Delete from selection of all files.
+
+        Parameters
+        ----------
+        what : str
+            attribute to change (must be from Result.selection)
+        datasets : list of str or bool
+            name of datasets as list, supports ? and * wildcards.
+            True is equivalent to [*], False is equivalent to []
+
+        """
+        for r in self.results.values(): r.pick_less(what,datasets)
+
+
+    def _starmap(self,func,args):
+        """Evaluate a function for the arguments of each file in worker processes."""
+        num_threads = damask.environment.options['DAMASK_NUM_THREADS']
+        processes = min(len(args),int(num_threads) if num_threads is not None else mp.cpu_count())
+        if processes <= 1:
+            values = [func(*a) for a in args]
+        else:
+            with mp.Pool(processes) as pool:
+                values = pool.starmap(func,args,chunksize=1)
+        return dict(zip(self.results,values))
+
+
+    def map(self,func,*args,**kwargs):
+        """
+        Apply a function to each file.
+
+        Parameters
+        ----------
+        func : callable
+            Function with signature func(result,*args,**kwargs). Needs to
+            be defined at module level to be sent to the worker processes.
+        *args, **kwargs
+            Further arguments of func.
+
+        Returns
+        -------
+        values : dict
+            Return values of func, keyed by file name.
+
+        """
+        return self._starmap(_apply,[(func,r,args,kwargs) for r in self.results.values()])
+
+
+    def read_dataset(self,label,c=0,plain=False):
+        """
+        Read a dataset for the selected increments of each file.
+
+        Parameters
+        ----------
+        label : str
+            Label of the dataset.
+        c : int, optional
+            Constituent to consider. Defaults to 0.
+        plain : bool, optional
+            Return structured data (e.g. orientations) as plain float array. Defaults to False.
+
+        Returns
+        -------
+        data : dict of numpy.ndarray of shape (N_increments,N_cells,...)
+            Data of each file, keyed by file name.
+
+        """
+        return self._starmap(_read_increments,[(r,label,c,plain) for r in self.results.values()])
+
+
+    def probe(self,label,cells=None,coordinates=None,c=0,plain=False):
+        """
+        History of a dataset at selected cells of each file.
+
+        See Result.probe for the parameters.
+
+        Returns
+        -------
+        history : dict of numpy.ndarray of shape (N_increments,N_points,...)
+            History of each file, keyed by file name.
+
+        """
+        return self._starmap(_call,[(r,'probe',(label,),{'cells':cells,'coordinates':coordinates,'c':c,'plain':plain})
+                                    for r in self.results.values()])
+
+
+    def statistics(self,label,**kwargs):
+        """
+        Statistics of a dataset for the selected increments of each file.
+
+        See Result.statistics for the parameters.
+
+        Returns
+        -------
+        statistics : dict of dict
+            Statistics of each file, keyed by file name.
+
+        """
+        return self._starmap(_call,[(r,'statistics',(label,),kwargs) for r in self.results.values()])
+
+
+    def aggregate(self,label,IDs,**kwargs):
+        """
+        Aggregate a dataset per grain for the selected increments of each file.
+
+        See Result.aggregate for the parameters. The grain IDs
+        can be given per file as dictionary keyed by file name.
+
+        Returns
+        -------
+        aggregates : dict of dict
+            Aggregated values of each file, keyed by file name.
+
+        """
+        return self._starmap(_call,[(r,'aggregate',(label,IDs[f] if isinstance(IDs,dict) else IDs),kwargs)
+                                    for f,r in self.results.items()])
@@ -0,0 +1,84 @@
+import pytest
+import numpy as np
+
+from damask import Result
+
+
+@pytest.fixture
+def reference_dir(reference_dir_base):
+    """Directory containing reference results."""
+    return reference_dir_base/'Result'
+
+@pytest.fixture
+def default(reference_dir):
+    """Small Result file with all increments selected."""
+    r = Result(reference_dir/'12grains6x7x8_tensionY.hdf5')
+    r.pick('increments',True)
+    return r
+
+@pytest.fixture
+def F(default):
+    """Deformation gradient of all increments."""
+    return np.stack([default.read_dataset([l for l in default.get_dataset_location('F') if l.startswith(i+'/')])
+                     for i in default.increments])
+
+
+class TestDatasetView:
+
+    def test_self_report(self,default):
+        print(default.view('F'))
+
+    def test_compute(self,default,F):
+        v = default.view('F')
+        assert v.shape == F.shape and v.dtype == F.dtype and len(v) == len(F)
+        assert np.array_equal(np.asarray(v),F,equal_nan=True)
+
+    @pytest.mark.parametrize('key',[-1,(slice(-3,None),[1,5,7]),(slice(None),0),(2,3),(2,3,1,1),(Ellipsis,0),
+                                    (slice(None,None,2),np.arange(336)%3==0,slice(1,None),0)])
+    def test_getitem(self,default,F,key):
+        v = default.view('F')[key]
+        k = key if isinstance(key,tuple) else (key,)
+        if len(k) > 1 and not isinstance(k[1],(int,slice)) and k[1] is not Ellipsis:                  # orthogonal indexing
+            ref = F[k[0]][:,k[1]][(slice(None),slice(None))+k[2:]]
+        else:
+            ref = F[key]
+        assert v.shape == np.shape(ref)
+        assert np.array_equal(v.compute(),ref,equal_nan=True)
+
+    def test_getitem_chained(self,default,F):
+        assert np.array_equal(default.view('F')[2:][:,4:9][1,1:3,0].compute(),F[2:][:,4:9][1,1:3,0])
+
+    @pytest.mark.parametrize('reduction',['sum','mean','min','max'])
+    @pytest.mark.parametrize('axis',[None,0,1,(0,2),-1,(1,2,3)])
+    def test_reduction(self,default,F,reduction,axis):
+        assert np.allclose(getattr(default.view('F')[:,:50],reduction)(axis=axis),
+                           getattr(F[:,:50],reduction)(axis=axis))
+
+    def test_reduction_numpy(self,default,F):
+        assert np.allclose(np.mean(default.view('F')[-3:],axis=0),np.mean(F[-3:],axis=0),equal_nan=True)
+
+    def test_reduction_invalid(self,default):
+        with pytest.raises(np.AxisError):
+            default.view('F').sum(axis=4)
+
+    def test_ufunc(self,default,F):
+        v = default.view('F')
+        w = np.sqrt(v**2+1)*2 - v + np.eye(3)
+        assert w.shape == F.shape
+        assert np.allclose(w[1:3,4:8,0].compute(),(np.sqrt(F**2+1)*2-F+np.eye(3))[1:3,4:8,0],equal_nan=True)
+
+    def test_ufunc_invalid(self,default):
+        with pytest.raises(ValueError):
+            default.view('F') + default.view('F')[:,0]
+
+    def test_plain(self,default):
+        assert default.view('O',plain=True).shape[-1] == 4
+
+    def test_geometry(self,default):
+        assert default.view('u_n').shape == (len(default.increments),np.prod(default.grid+1),3)
+
+    def test_invalid(self,default):
+        with pytest.raises(ValueError):
+            default.view('does_not_exist')
+        with pytest.raises(IndexError):
+            default.view('F')[0,0,0,0,0]
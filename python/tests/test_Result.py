@@ -2,17 +2,28 @@ import time
 import shutil
 import os
 import sys
+import json
+import multiprocessing as mp
 from datetime import datetime
 
 import pytest
 import numpy as np
 import h5py
+import vtk
+from vtk.util.numpy_support import vtk_to_numpy
 
 from damask import Result
 from damask import Rotation
 from damask import Orientation
+from damask import VTK
+from damask import Geom
 from damask import mechanics
 from damask import grid_filters
+from damask import _result
+
+def _fail_for_partial_blocks(x):
+    if len(x['data']) != 50: raise ValueError('partial block')
+    return {'data':x['data'],'label':'partial','meta':{'Unit':'-','Description':'test','Creator':'test'}}
 
 @pytest.fixture
 def default(tmp_path,reference_dir):
@@ -41,6 +52,18 @@ class TestResult:
     def test_self_report(self,default):
         print(default)
 
+    def test_self_report_lazy(self,default):
+        r = Result(default.fname)
+        assert r.fname.name in repr(r) and r._times is None
+        with h5py.File(r.fname,'r') as f:
+            assert r.times == [round(f[i].attrs['time/s'],12) for i in r.increments]
+
+    @pytest.mark.parametrize('fixture',['default','single_phase'])
+    def test_names(self,request,fixture):
+        r = request.getfixturevalue(fixture)
+        with h5py.File(r.fname,'r') as f:
+            assert r.constituents   == [c.decode() for c in np.unique(f['mapping/phase']['Name'])]
+            assert r.materialpoints == [m.decode() for m in np.unique(f['mapping/homogenization']['Name'])]
 
     def test_pick_all(self,default):
         default.pick('increments',True)
@@ -93,6 +116,257 @@ class TestResult:
         with pytest.raises(AttributeError):
             default.pick('invalid',True)
 
+    def test_session(self,default):
+        F = default.read_dataset(default.get_dataset_location('F'))
+        with default as r:
+            assert r._handle is not None
+            assert np.all(F == r.read_dataset(r.get_dataset_location('F')))
+            r.add_Cauchy()
+            assert r._handle is not None and r._handle.mode == 'r'
+            assert len(r.get_dataset_location('sigma')) > 0
+        assert default._handle is None and default._pool is None
+
+    def test_pool_reuse(self,default):
+        default.add_Cauchy()
+        assert default._pool is None
+        with default as r:
+            r.add_Mises('sigma')
+            pool = r._pool
+            r.add_norm('sigma')
+            assert r._pool is pool is not None
+        assert default._pool is None
+        assert len(default.get_dataset_location('|sigma|_fro')) > 0
+
+    @pytest.mark.skipif(not os.path.isdir('/dev/shm'),reason='shared memory not listed in /dev/shm')
+    def test_pool_cleanup(self,default):
+        before = set(os.listdir('/dev/shm'))
+        with pytest.raises(Exception):
+            default._add_generic_pointwise(default._add_absolute,{'x':'F'},{'unpicklable':lambda x: x})
+        assert set(os.listdir('/dev/shm')) <= before
+
+    @pytest.mark.parametrize('label',['F','O','xi_sl','u_n','invalid'])
+    def test_dataset_index(self,default,label):
+        default.pick('increments',True)
+        with h5py.File(default.fname,'r') as f:
+            scanned = [p for i in default.increments
+                         for p in ([f'{i}/geometry/{label}'] if f'{i}/geometry/{label}' in f else []) +
+                                  [f'{g}/{label}' for g in default.groups_with_datasets(True) if g.startswith(f'{i}/')
+                                                                                            and label in f[g]]]
+            assert sorted(default.get_dataset_location(label)) == sorted(scanned)
+            for p in scanned:
+                assert default._get_index()[os.path.dirname(p)][label]['shape'] == f[p].shape
+
+    def test_mapping(self,default):
+        loc = default.get_dataset_location('F')
+        with h5py.File(default.fname,'r') as f:
+            mapping = f['mapping/cellResults/constituent'][:,0]
+            F = np.full((default.Nmaterialpoints,3,3),np.nan)
+            for p in loc:
+                cells = np.where(mapping['Name'] == p.split('/')[2].encode())[0]
+                F[cells] = f[p][()][mapping['Position'][cells]]
+        assert np.all(F == default.read_dataset(loc))
+        placed = default.place('F',split=False).get(loc[0])
+        assert np.all(F[~np.isnan(placed)] == placed[~np.isnan(placed)])
+
+    @pytest.mark.parametrize('label',['F','O','u_p'])
+    @pytest.mark.parametrize('block_size',[1,50,None])
+    def test_read_dataset_blocks(self,default,label,block_size):
+        loc = default.get_dataset_location(label)
+        blocks = list(default.read_dataset_blocks(loc,block_size=block_size))
+        assert np.all([b.shape[0] == c.stop-c.start for c,b in blocks])
+        assert np.all(np.concatenate([b for _,b in blocks]) == default.read_dataset(loc))
+
+    def test_read_rows(self,default):
+        with h5py.File(default.fname,'r') as f:
+            dataset = f[default.get_dataset_location('F')[0]]
+            rows = np.random.randint(0,dataset.shape[0],100)
+            assert np.all(Result._read_rows(dataset,rows,max_gap=3) == dataset[()][rows])
+
+    @pytest.mark.parametrize('label',['F','O','u_p'])
+    def test_probe(self,default,label):
+        default.pick('increments',True)
+        cells = np.random.randint(0,default.Nmaterialpoints,5)
+        history = default.probe(label,cells)
+        assert history.shape[:2] == (len(default.increments),5)
+        for i,inc in enumerate(default.iterate('increments')):
+            assert np.all(history[i] == default.read_dataset(default.get_dataset_location(label))[cells])
+
+    def test_probe_coordinates(self,default):
+        cells = np.random.randint(0,default.Nmaterialpoints,5)
+        assert np.all(default.probe('P',coordinates=default.cell_coordinates[cells]) ==
+                      default.probe('P',cells))
+
+    def test_follow(self,default):
+        with h5py.File(default.fname,'a') as f:
+            for inc in default.increments[3:]:
+                f.move(inc,f'_{inc}')                                                               # simulation still running
+        live = Result(default.fname)
+        assert len(live.increments) == 3
+        visited = []
+        for inc in live.follow([('Cauchy',{})],interval=0.01,timeout=0.2):
+            visited.append(inc)
+            assert live.selection['increments'] == [inc]
+            assert live.get_dataset_location('sigma') != []
+            if len(visited) == 2:
+                with h5py.File(default.fname,'a') as f:
+                    for inc in default.increments[3:]:
+                        f.move(f'_{inc}',inc)
+        assert visited == default.increments
+        assert live.selection['increments'] == default.increments[:3]
+
+    def test_follow_incomplete(self,default,monkeypatch):
+        with h5py.File(default.fname,'a') as f:
+            for inc in default.increments[2:]:
+                f.move(inc,f'_{inc}')
+        live = Result(default.fname)
+        assert live.get_dataset_location('F_late') == []
+        add_multiple,locked = live.add_multiple,[True]
+        def add_locked(quantities):
+            if locked.pop() if locked else False: raise OSError('unable to lock file')
+            add_multiple(quantities)
+        monkeypatch.setattr(live,'add_multiple',add_locked)
+        visited = []
+        for inc in live.follow([('Cauchy',{})],interval=0.01,timeout=0.2):
+            visited.append(inc)
+            assert live.get_dataset_location('sigma') != []
+            if len(visited) == 1:
+                with h5py.File(default.fname,'a') as f:
+                    for l in live.get_dataset_location('F'):
+                        f[l.replace(inc,live.increments[1])+'_late'] = f[l][()]                    # written after indexing
+                    for inc in default.increments[2:]:
+                        f.move(f'_{inc}',inc)
+            else:
+                assert (live.get_dataset_location('F_late') != []) == (inc == default.increments[1])
+        assert visited == default.increments and locked == []
+
+    @pytest.mark.parametrize('grouped',[True,False])
+    def test_statistics(self,default,grouped):
+        default.pick('times',True)
+        stats = default.statistics('P',percentiles=[0,100],bins=4,grouped=grouped)
+        for j,inc in enumerate(default.increments):
+            default.pick('increments',[inc])
+            with h5py.File(default.fname,'r') as f:
+                P = {l.split('/')[2]:f[l][()] for l in default.get_dataset_location('P')}
+            for name,s in stats.items() if grouped else [(None,stats)]:
+                data = P[name] if grouped else np.concatenate(list(P.values()))
+                assert s['count'][j] == len(data)
+                assert np.allclose(s['mean'][j],np.mean(data,axis=0))
+                assert np.allclose(s['std'][j],np.std(data,axis=0))
+                assert np.allclose(s['percentiles'][j],[np.min(data,axis=0),np.max(data,axis=0)])
+                assert np.all(s['histogram'][j].sum(axis=0) == len(data))
+
+    def test_statistics_empty(self,default):
+        location = default.get_dataset_location('P')[0]
+        with h5py.File(default.fname,'a') as f:
+            del f[location]
+        r = Result(default.fname)
+        r.pick('increments',[location.split('/')[0],r.increments[0]])
+        stats = r.statistics('P',percentiles=[0,50,100],bins=4,grouped=True)[location.split('/')[2]]
+        assert stats['count'][0] == 0 and stats['count'][1] > 0
+        assert np.all(np.isnan(stats['percentiles'][0])) and np.all(np.isnan(stats['mean'][0]))
+        assert np.all(stats['histogram'][0] == 0) and not np.any(np.isnan(stats['percentiles'][1]))
+
+    def test_statistics_value_range(self,default):
+        default.pick('times',True)
+        stats = default.statistics('P',bins=5,value_range=(-1e8,1e8))
+        for j,inc in enumerate(default.increments):
+            default.pick('increments',[inc])
+            P = default.read_dataset(default.get_dataset_location('P')).reshape(-1,9)
+            assert np.all(stats['histogram'][j].reshape(5,9).T == [np.histogram(p,5,(-1e8,1e8))[0] for p in P.T])
+
+    def test_statistics_invalid(self,default):
+        with pytest.raises(ValueError):
+            default.statistics('does_not_exist')
+
+    @pytest.mark.parametrize('roi',[{'box':([1,2,3],[4,6,8])},{'slab':(1,2,4)},{'plane':(0,5)},
+                                    {'mask':np.random.default_rng(0).random((6,7,8))>.7}])
+    def test_region(self,default,roi):
+        region = default.region(**roi)
+        P = default.read_dataset(default.get_dataset_location('P'),0)
+        u = default.read_dataset(default.get_dataset_location('u_n'))
+        assert np.allclose(default.read_dataset(default.get_dataset_location('P'),0,cells=region['cells']),
+                           P[region['cells']])
+        assert np.allclose(default.read_dataset(default.get_dataset_location('u_n'),cells=region['nodes']),
+                           u[region['nodes']])
+        assert np.allclose(region['cell_coordinates'],default.cell_coordinates[region['cells']])
+        assert np.allclose(region['node_coordinates'],default.node_coordinates[region['nodes']])
+        if 'mask' not in roi:
+            assert np.prod(region['grid']) == len(region['cells'])
+
+    @pytest.mark.parametrize('roi',[{},{'box':([1,2,3],[1,6,8])},{'plane':(0,1),'slab':(0,1,2)},
+                                    {'mask':np.ones((3,3,3),bool)}])
+    def test_region_invalid(self,default,roi):
+        with pytest.raises(ValueError):
+            default.region(**roi)
+
+    def test_aggregate(self,default,reference_dir):
+        grain = Geom.load(reference_dir/'12grains6x7x8.vtr').material.flatten(order='F')
+        a = default.aggregate('P',grain,['count','mean','min','max'])
+        o = default.aggregate('O',grain)
+        P = default.read_dataset(default.get_dataset_location('P'),0)
+        O = default.read_dataset(default.get_dataset_location('O'),0,plain=True).reshape(-1,4)
+        lattice = {n:'cF' if 'fcc' in n else 'cI' for n in default.constituents}
+        phase = default.get_constituent_ID()
+        for i,ID in enumerate(a['ID']):
+            assert a['count'][0,i] == np.count_nonzero(grain==ID)
+            assert np.allclose(a['mean'][0,i],np.mean(P[grain==ID],axis=0))
+            assert np.allclose(a['min'][0,i],np.min(P[grain==ID],axis=0))
+            assert np.allclose(a['max'][0,i],np.max(P[grain==ID],axis=0))
+            avg = Orientation(rotation=O[grain==ID],
+                              lattice=lattice[[n for n in default.constituents
+                                               if int(n.split('_')[0]) == phase[grain==ID][0]][0]]).average()
+            assert np.allclose(o['mean'][0,i],avg.quaternion*np.sign(avg.quaternion[0]))
+
+    def test_aggregate_invalid(self,default):
+        with pytest.raises(ValueError):
+            default.aggregate('P',np.ones(len(default.cell_coordinates)),'median')
+        with pytest.raises(ValueError):
+            default.aggregate('O',np.ones(len(default.cell_coordinates)),'max')
+
+    @pytest.mark.parametrize('compression',['gzip','lzf',None])
+    @pytest.mark.parametrize('float32',[True,False])
+    def test_storage(self,default,compression,float32):
+        default.set_storage(chunk_size=1024)
+        with default.storage(compression=compression,float32=float32):
+            default.add_Cauchy()
+        loc = default.get_dataset_location('sigma')
+        with h5py.File(default.fname,'r') as f:
+            for l in loc:
+                assert f[l].compression == compression
+                assert f[l].dtype == (np.float32 if float32 else np.float64)
+                assert np.prod(f[l].chunks)*f[l].dtype.itemsize <= 1024
+        assert default._storage['compression'] == 'gzip' and not default._storage['float32']
+        in_memory = mechanics.Cauchy(default.read_dataset(default.get_dataset_location('P')),
+                                     default.read_dataset(default.get_dataset_location('F')))
+        assert np.allclose(in_memory,default.read_dataset(loc),rtol=1e-6 if float32 else 1e-12)
+
+    def test_storage_empty(self,tmp_path,default):
+        with h5py.File(tmp_path/'empty.hdf5','w') as f:
+            for shape in [(0,3,3),(5,0),()]:
+                f.create_dataset(str(shape),shape=shape,**default._storage_options(shape,np.float64))
+                assert f[str(shape)].shape == shape and f[str(shape)].chunks is None
+
+    def test_storage_invalid(self,default):
+        with pytest.raises(KeyError):
+            default.set_storage(chunks=4)
+        with pytest.raises(ValueError):
+            default.set_storage(compression='zip')
+
+    def test_add_multiple(self,default):
+        default.add_multiple([('Mises',{'T_sym':'sigma'}),
+                              ('Cauchy',{}),
+                              ('strain_tensor',{}),
+                              ('Mises',{'T_sym':'epsilon_V^0.0(F)'}),
+                              ('Mises',{'T_sym':'invalid'})])
+        F     = default.read_dataset(default.get_dataset_location('F'))
+        sigma = mechanics.Cauchy(default.read_dataset(default.get_dataset_location('P')),F)
+        epsilon = mechanics.strain_tensor(F,'V',0.0)
+        assert np.allclose(sigma,default.read_dataset(default.get_dataset_location('sigma')))
+        assert np.allclose(mechanics.Mises_stress(sigma).reshape(-1,1),
+                           default.read_dataset(default.get_dataset_location('sigma_vM')))
+        assert np.allclose(mechanics.Mises_strain(epsilon).reshape(-1,1),
+                           default.read_dataset(default.get_dataset_location('epsilon_V^0.0(F)_vM')))
+
     def test_add_absolute(self,default):
         default.add_absolute('F_e')
         loc = {'F_e':   default.get_dataset_location('F_e'),
@@ -120,6 +394,19 @@ class TestResult:
         in_file   = default.read_dataset(loc['x'],0)
         assert np.allclose(in_memory,in_file)
 
+    def test_add_calculation_local_function(self,default):
+        def local_twice(x): return 2.0*x
+        default.enable_user_function(local_twice)
+        default.add_calculation('y','local_twice(#F#)')
+        F = default.read_dataset(default.get_dataset_location('F'))
+        assert np.allclose(2.0*F,default.read_dataset(default.get_dataset_location('y')))
+
+        def local_twice(x): return 3.0*x                                                            # noqa
+        default.enable_user_function(local_twice)
+        default.allow_modification()
+        default.add_calculation('y','local_twice(#F#)')
+        assert np.allclose(3.0*F,default.read_dataset(default.get_dataset_location('y')))
+
     def test_add_Cauchy(self,default):
         default.add_Cauchy('P','F')
         loc = {'F':    default.get_dataset_location('F'),
@@ -146,6 +433,36 @@ class TestResult:
         in_file   = default.read_dataset(loc['s_P'],0)
         assert np.allclose(in_memory,in_file)
 
+    @pytest.mark.parametrize('formula',['__import__("os").getcwd()','np.__dict__','#F#.__class__',
+                                        'open("/dev/null")','[x for x in #F#]','np.load("x.npy")',
+                                        '#F# +'])
+    def test_add_calculation_invalid(self,default,formula):
+        with pytest.raises(ValueError):
+            default.add_calculation('x',formula)
+
+    def test_add_calculation_blocks(self,default):
+        F = np.random.random((100_000,3,3))
+        assert np.allclose(_result._evaluate_formula('np.sqrt(#F#[:,0,0])*2',{'F':F},block_size=999),
+                           np.sqrt(F[:,0,0])*2)
+        assert np.allclose(_result._evaluate_formula('np.sum(#F#)',{'F':F},block_size=999),
+                           np.sum(F))
+
+    def test_add_blocks(self,default):
+        default._block_size = 50
+        default.add_multiple([('Cauchy',{}),('Mises',{'T_sym':'sigma'})])
+        default.add_calculation('P_sum','np.sum(#P#,axis=0)+0*#P#')
+        default._add_generic_pointwise(_fail_for_partial_blocks,{'x':'P'})
+        F = default.read_dataset(default.get_dataset_location('F'))
+        P = default.read_dataset(default.get_dataset_location('P'))
+        sigma = mechanics.Cauchy(P,F)
+        assert np.allclose(sigma,default.read_dataset(default.get_dataset_location('sigma')))
+        assert np.allclose(mechanics.Mises_stress(sigma).reshape(-1,1),
+                           default.read_dataset(default.get_dataset_location('sigma_vM')))
+        with h5py.File(default.fname,'r') as f:
+            for l in default.get_dataset_location('P_sum'):
+                assert np.allclose(f[l][()],np.sum(f[l.replace('P_sum','P')][()],axis=0))
+        assert default.get_dataset_location('partial') == []                                       # last block fails
+
     @pytest.mark.parametrize('eigenvalue,function',[('max',np.amax),('min',np.amin)])
     def test_add_eigenvalue(self,default,eigenvalue,function):
         default.add_Cauchy('P','F')
@@ -343,6 +660,39 @@ class TestResult:
         else:
             assert created_first == created_second and not np.allclose(default.read_dataset(loc),311.)
 
+    def test_add_provenance(self,default):
+        def created(r):
+            with h5py.File(r.fname,'r') as f:
+                return [f[l].attrs['Created'] for l in r.get_dataset_location('sigma')]
+
+        default.pick('increments',True)
+        default.add_Cauchy()
+        first = created(default)
+        time.sleep(1.1)
+        default.add_Cauchy()
+        assert created(default) == first
+
+        default.pick('increments',default.increments[-1])
+        default.allow_modification()
+        default.add_calculation('P','#P#*2.0')
+        default.disallow_modification()
+        default.pick('increments',True)
+        default.add_Cauchy()
+        second = created(default)
+        assert second[:-2] == first[:-2] and second[-1] != first[-1]
+        in_memory = mechanics.Cauchy(default.read_dataset(default.get_dataset_location('P')),
+                                     default.read_dataset(default.get_dataset_location('F')))
+        assert np.allclose(in_memory,default.read_dataset(default.get_dataset_location('sigma')))
+
+    def test_recipe(self):
+        def f(x): return 2.0*x
+        g = f
+        def f(x): return 3.0*x                                                                      # noqa
+        assert Result._recipe(f,{'x':'F'},{}) == Result._recipe(f,{'x':'F'},{})
+        assert Result._recipe(f,{'x':'F'},{}) != Result._recipe(g,{'x':'F'},{})
+        assert Result._recipe(Result._add_absolute,{'x':'F'},{'func':f}) != \
+               Result._recipe(Result._add_absolute,{'x':'F'},{'func':g})
+
     @pytest.mark.parametrize('allowed',['off','on'])
     def test_rename(self,default,allowed):
         if allowed == 'on':
@@ -355,6 +705,20 @@ class TestResult:
         with pytest.raises(PermissionError):
             default.rename('P','another_new_name')
 
+    def test_rename_readd(self,default):
+        default.add_Cauchy()
+        default.allow_modification()
+        default.rename('sigma','sigma_old')
+        assert default.get_dataset_location('sigma') == []
+        default.add_Cauchy()
+        assert len(default.get_dataset_location('sigma')) > 0
+        assert len(Result(default.fname).get_dataset_location('sigma_old')) > 0
+        default.rename('sigma','sigma_new')
+        r = Result(default.fname)
+        r.add_Cauchy()
+        assert np.all(r.read_dataset(r.get_dataset_location('sigma')) ==
+                      r.read_dataset(r.get_dataset_location('sigma_old')))
+
     @pytest.mark.parametrize('mode',['cell','node'])
     def test_coordinates(self,default,mode):
          if   mode == 'cell':
@@ -375,6 +739,226 @@ class TestResult:
         os.chdir(tmp_path)
         single_phase.save_vtk(mode=mode)
 
+    def test_vtk_complete(self,tmp_path,default):
+        os.chdir(tmp_path)
+        default.pick('times',True)
+        default.save_vtk('F')
+        assert len(list(tmp_path.glob('*.vtr'))) == len(default.increments)
+        assert all(v.GetPointData().GetArray('u') is not None and v.GetCellData().GetNumberOfArrays() > 0
+                   for v in [VTK.load(f).vtk_data for f in tmp_path.glob('*.vtr')])
+        assert mp.active_children() == []
+
+    def test_vtk_single(self,tmp_path,default,monkeypatch):
+        os.chdir(tmp_path)
+        monkeypatch.setattr(_result.mp,'Pool',None)
+        default.save_vtk('F')
+        v = VTK.load(next(tmp_path.glob('*.vtr'))).vtk_data
+        for name,x in default._vtk_datasets('F','cell')[0][1][:-1]:
+            F = default.read_dataset(x,0)
+            assert np.array_equal(vtk_to_numpy(v.GetCellData().GetArray(name)).reshape(F.shape),F.astype(np.float32),
+                                  equal_nan=True)
+        assert _result._vtk_export == {}
+
+    @pytest.mark.parametrize('mode',['point','cell'])
+    def test_VTKHDF(self,tmp_path,default,mode):
+        if not hasattr(vtk,'vtkHDFReader'): pytest.skip('VTK without VTKHDF support')
+        shutil.copy(default.fname,tmp_path/'r.hdf5')
+        result = Result(tmp_path/'r.hdf5')
+        result.pick('times',True)
+        os.chdir(tmp_path)
+        result.save_VTKHDF('F',mode)
+        reader = vtk.vtkHDFReader()
+        reader.SetFileName('r.vtkhdf')
+        reader.UpdateInformation()
+        assert reader.GetNumberOfSteps() == len(result.increments)
+        reader.SetStep(reader.GetNumberOfSteps()-1)
+        reader.Update()
+        data = reader.GetOutput().GetPointData() if mode == 'point' else reader.GetOutput().GetCellData()
+        F = result.read_dataset([l for l in result.get_dataset_location('F')
+                                 if l.startswith(result.increments[-1]+'/')],0)
+        assert np.allclose(vtk_to_numpy(data.GetArray('1_constituent_generic_F')),F.reshape(-1,9))
+
+    def test_VTKHDF_float32(self,tmp_path,default):
+        default.save_VTKHDF('F',fname=tmp_path/'single.vtkhdf',float32=True)
+        default.save_VTKHDF('F',fname=tmp_path/'double.vtkhdf')
+        with h5py.File(tmp_path/'single.vtkhdf','r') as single, h5py.File(tmp_path/'double.vtkhdf','r') as double:
+            name = list(double['VTKHDF/CellData'])[0]
+            assert single['VTKHDF/CellData'][name].dtype == np.float32
+            assert double['VTKHDF/CellData'][name].dtype == np.float64
+            assert np.allclose(single['VTKHDF/CellData'][name],double['VTKHDF/CellData'][name],equal_nan=True)
+
+    @pytest.mark.parametrize('format',['parquet','hdf5','npz'])
+    def test_save_columns(self,tmp_path,default,format):
+        if format == 'parquet': pytest.importorskip('pyarrow')
+        os.chdir(tmp_path)
+        default.pick('times',True)
+        default.save_columns(['F','O'],format=format,block_size=100)
+        default.pick('increments',default.increments[-1:])
+        F = default.read_dataset(default.get_dataset_location('F'))
+        N = len(F)
+        if format == 'parquet':
+            import pyarrow.parquet as pq
+            table = pq.read_table(f'{default.fname.stem}_columns.parquet')
+            assert json.loads(table.schema.metadata[b'damask'])['shapes']['F'] == [3,3]
+            assert np.allclose(np.array(table.column('F').to_pylist()[-N:]).reshape(-1,3,3),F)
+        elif format == 'hdf5':
+            with h5py.File(f'{default.fname.stem}_columns.hdf5','r') as f:
+                assert np.allclose(f['F'][-N:],F) and f['O'].shape[1:] == (4,)
+        else:
+            npz = np.load(f'{default.fname.stem}_columns_inc{default.increments[-1][3:]}.npz')
+            assert np.allclose(npz['F'],F) and np.all(npz['cell'] == np.arange(N))
+
+    def test_save_columns_invalid(self,default):
+        with pytest.raises(ValueError):
+            default.save_columns('F',format='csv')
+        with pytest.raises(ValueError):
+            default.save_columns('F',default.fname,'hdf5')
+
+    @pytest.mark.parametrize('compression',['gzip','lzf',None])
+    def test_save_DADF5(self,tmp_path,default,compression):
+        default.pick('increments',default.increments[-1:])
+        default.pick('constituents',['1_pheno_fcc'])
+        default.save_DADF5(tmp_path/'extract.hdf5',['F','O'],compression=compression,chunk_size=1000,float32=True)
+        extract = Result(tmp_path/'extract.hdf5')
+        assert extract.increments == default.increments[-1:] and extract.times == default.times[-1:]
+        assert np.allclose(extract.read_dataset(extract.get_dataset_location('F')),
+                           default.read_dataset(default.get_dataset_location('F')),equal_nan=True)
+        assert np.allclose(extract.read_dataset(extract.get_dataset_location('O'),plain=True),
+                           default.read_dataset(default.get_dataset_location('O'),plain=True),equal_nan=True)
+        assert extract.get_dataset_location('P') == [] and extract.get_dataset_location('u_p') != []
+        extract.pick('constituents',['2_pheno_bcc'])
+        assert extract.get_dataset_location('F') == []
+
+    def test_save_DADF5_invalid(self,default):
+        with pytest.raises(ValueError):
+            default.save_DADF5(default.fname)
+
+    def test_evaluate(self,default):
+        default.pick('times',[10.0,20.0])
+        d = dict(default.evaluate([('Cauchy',{}),('Mises',{'T_sym':'sigma'})],block_size=50))
+        assert list(d) == default.selection['increments']
+        assert default.get_dataset_location('sigma') == []
+        default.add_Cauchy()
+        default.add_Mises('sigma')
+        for label in ['sigma','sigma_vM']:
+            for i in default.selection['increments']:
+                ref = default.read_dataset([l for l in default.get_dataset_location(label) if l.startswith(i+'/')])
+                assert np.allclose(d[i][label],ref,equal_nan=True)
+
+    def test_evaluate_read_only(self,default):
+        os.chmod(default.fname,0o444)
+        try:
+            inc,d = next(default.evaluate([('determinant',{'T':'F'})]))
+            assert inc == default.selection['increments'][0] and d['det(F)'].shape == (default.Nmaterialpoints,1)
+        finally:
+            os.chmod(default.fname,0o644)
+
+    @pytest.mark.parametrize('quantities',[('determinant',{'T':'F'}),[('determinant','F')]])
+    def test_evaluate_invalid(self,default,quantities):
+        with pytest.raises(TypeError):
+            default.evaluate(quantities)
+        with pytest.raises(TypeError):
+            default.add_multiple(quantities)
+
+    @pytest.mark.parametrize('mode',['cell','point'])
+    def test_deformed_coordinates(self,default,mode):
+        default.pick('times',[0.0,10.0,20.0])
+        x = default.deformed_coordinates(mode,batch_size=2)
+        for i,inc in enumerate(default.selection['increments']):
+            F = default.read_dataset([l for l in default.get_dataset_location('F') if l.startswith(inc+'/')])
+            F = F.reshape(tuple(default.grid)+(3,3),order='F')
+            x_ref = (grid_filters.cell_coord if mode == 'cell' else grid_filters.node_coord)(default.size,F,default.origin)
+            assert np.allclose(x[i],x_ref.reshape(-1,3,order='F'))
+
+    def test_deformed_coordinates_persist(self,default):
+        x = default.deformed_coordinates(persist=True)
+        assert default.get_dataset_location('x_p') != []
+        reopened = Result(default.fname)
+        reopened.pick('times',20.0)
+        assert np.allclose(reopened.deformed_coordinates(),x) and reopened._deformed == {}
+
+    def test_deformed_coordinates_cache(self,default):
+        default.pick('times',True)
+        x = default.deformed_coordinates()
+        assert default._deformed == {}
+        budget = 2*np.prod(default.grid)*3*8
+        default.enable_cache(budget)
+        assert np.allclose(default.deformed_coordinates(),x)
+        assert default.cache_info()['size'] <= budget and len(default._deformed) == len(default.increments)
+        hits = default.cache_info()['hits']
+        assert np.allclose(default.deformed_coordinates(),x) and default.cache_info()['hits'] > hits
+        default.disable_cache()
+        default.enable_cache()
+        default.deformed_coordinates()
+        assert default.cache_info()['misses'] == 2*len(default.increments)                          # displacement and F
+        default.deformed_coordinates()
+        assert default.cache_info()['hits'] == len(default.increments)
+        assert default.cache_info()['misses'] == 2*len(default.increments)
+
+    def test_deformed_coordinates_invalid(self,default):
+        with pytest.raises(ValueError):
+            default.deformed_coordinates('nodes')
+        with pytest.raises(ValueError):
+            default.deformed_coordinates(F='does_not_exist')
+
+    def test_cache(self,default):
+        assert default.cache_info() is None
+        loc = default.get_dataset_location('F')
+        F = default.read_dataset(loc)
+        default.enable_cache()
+        assert np.array_equal(default.read_dataset(loc),F,equal_nan=True)
+        a = default.read_dataset(loc)
+        assert a is default.read_dataset(loc)
+        with pytest.raises(ValueError):
+            a[...] = 0.0
+        assert np.array_equal(default.read_dataset(loc),F,equal_nan=True)
+        assert np.array_equal(default.read_dataset(loc,cells=[1,3]),F[[1,3]],equal_nan=True)
+        assert np.array_equal(default.read_dataset(default.get_dataset_location('O'),plain=True),
+                              default.read_dataset(default.get_dataset_location('O'),plain=True),equal_nan=True)
+        info = default.cache_info()
+        assert info['hits'] == 4 and info['misses'] == 3 and info['entries'] == 3
+        default.enable_cache(F.nbytes)
+        assert default.cache_info()['evictions'] == 1 and default.cache_info()['size'] <= F.nbytes
+        default.add_absolute('F')
+        assert default.cache_info()['entries'] == 0
+        default.disable_cache()
+        assert default.cache_info() is None
+
+    def test_place(self,default):
+        t = default.place(['F','P'])
+        for inc in t:
+            assert set(t[inc].shapes) == {'constituent/1_pheno_fcc/generic/F','constituent/1_pheno_fcc/generic/P',
+                                          'constituent/2_pheno_bcc/generic/F','constituent/2_pheno_bcc/generic/P'}
+
     def test_XDMF(self,tmp_path,single_phase):
         os.chdir(tmp_path)
         single_phase.save_XDMF()
+        assert not os.path.isfile(f'{single_phase.fname.stem}_topology.hdf5')
+
+    def test_XDMF_multiple_phases(self,tmp_path,default):
+        os.chdir(tmp_path)
+        default.pick('times',True)
+        default.save_XDMF()
+        assert os.path.isfile(f'{default.fname.stem}_topology.hdf5')
+        reader = vtk.vtkXdmfReader()
+        reader.SetFileName(default.fname.with_suffix('.xdmf').name)
+        reader.UpdateTimeStep(default.times[-1])
+        blocks = reader.GetOutputDataObject(0)
+        blocks = blocks if blocks.GetNumberOfBlocks() > 1 else blocks.GetBlock(0)
+        assert sum(blocks.GetBlock(b).GetNumberOfCells() for b in range(blocks.GetNumberOfBlocks())
+                   if blocks.GetBlock(b).GetCellData().GetNumberOfArrays() > 0) == len(default.cell_coordinates)
+
+    def test_XDMF_append(self,tmp_path,default):
+        os.chdir(tmp_path)
+        default.pick('times',True)
+        default.save_XDMF()
+        with open(default.fname.with_suffix('.xdmf').name) as f:
+            full = f.read()
+        default.pick('times',default.times[:3])
+        default.save_XDMF()
+        default.pick('times',default.times[5:])
+        default.save_XDMF(append=True)
+        default.pick('times',True)
+        default.save_XDMF(append=True)
+        with open(default.fname.with_suffix('.xdmf').name) as f:
+            assert f.read() == full
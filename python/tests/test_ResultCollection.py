@@ -0,0 +1,71 @@
+import shutil
+
+import pytest
+import numpy as np
+
+from damask import Result
+from damask import ResultCollection
+
+
+def N_cells(result):
+    return result.Nmaterialpoints
+
+
+@pytest.fixture
+def reference_dir(reference_dir_base):
+    """Directory containing reference results."""
+    return reference_dir_base/'Result'
+
+@pytest.fixture
+def collection(tmp_path,reference_dir):
+    """Collection of copies of a small Result file."""
+    for i in range(3):
+        shutil.copy(reference_dir/'12grains6x7x8_tensionY.hdf5',tmp_path/f'sweep_{i}.hdf5')
+    return ResultCollection(str(tmp_path/'sweep_*.hdf5'))
+
+
+class TestResultCollection:
+
+    def test_self_report(self,collection):
+        print(collection)
+
+    def test_self_report_lazy(self,collection):
+        r = next(iter(collection.results.values()))
+        assert f'({r._times_of(r.increments[:1])[0]}s to ' in repr(collection)
+        assert all(r._times is None for r in collection.results.values())
+
+    def test_index(self,collection,tmp_path):
+        assert len(collection) == 3 and list(collection) == [str(tmp_path/f'sweep_{i}.hdf5') for i in range(3)]
+        assert all(t == collection[tmp_path/'sweep_0.hdf5'].times for t in collection.times.values())
+
+    def test_invalid(self,tmp_path):
+        with pytest.raises(ValueError):
+            ResultCollection(str(tmp_path/'*.hdf5'))
+
+    def test_read_dataset(self,collection,tmp_path):
+        collection.pick('times',[10.0,20.0])
+        F = collection.read_dataset('F')
+        r = Result(tmp_path/'sweep_1.hdf5')
+        r.pick('times',20.0)
+        assert F[str(tmp_path/'sweep_1.hdf5')].shape == (2,)+r.read_dataset(r.get_dataset_location('F')).shape
+        assert np.allclose(F[str(tmp_path/'sweep_1.hdf5')][1],r.read_dataset(r.get_dataset_location('F')))
+
+    def test_probe(self,collection):
+        collection.pick('times',20.0)
+        F = collection.read_dataset('F')
+        for f,h in collection.probe('F',cells=[0,5]).items():
+            assert np.allclose(h[0],F[f][0,[0,5]])
+
+    def test_statistics(self,collection):
+        collection.pick('times',20.0)
+        s = list(collection.statistics('F',percentiles=[50]).values())
+        assert np.allclose(s[0]['mean'],s[-1]['mean'])
+
+    def test_aggregate(self,collection):
+        collection.pick('times',20.0)
+        IDs = {f:np.arange(r.Nmaterialpoints)%4 for f,r in collection.results.items()}
+        a = collection.aggregate('F',IDs)
+        assert all(v['mean'].shape == (1,4,3,3) for v in a.values())
+
+    def test_map(self,collection):
+        assert set(collection.map(N_cells).values()) == {6*7*8}